@@ -0,0 +1,177 @@
+"""
+Sorted age-at-onset arrays of the gene page cohorts.
+
+The AAO charts used to collect the ages of every workbook into a list and sort,
+describe and bin it in Python on every request. An AAO cohort holds the ages of
+a (disease, gene) cohort sorted once, together with the workbook row each age
+came from. A request's filters become one boolean mask over those rows, and the
+selected ages of a sorted array are still sorted, so the statistics are
+searchsorted/bincount over it.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cohort_manifest import get_cohort_frames, get_master_table
+from query_plan import select_rows, user_filters
+from utils import get_cached_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Most cohorts kept at once; the keys come from request parameters, so the least recently used go first
+AAO_COHORT_CACHE_SIZE = int(os.getenv("AAO_COHORT_CACHE_SIZE", 256))
+
+# (directory, disease_abbrev, gene, chart) -> {"master": master table it was built from, "cohort": build_aao_cohort}
+_cohorts = OrderedDict()
+_lock = threading.Lock()
+
+
+def build_aao_cohort(frames, plan, directory=None):
+    """
+    The rows of `frames` that satisfy `plan`: "ages" holds the known ages at
+    onset sorted (in the dtype of the aao column), "files" the filenames and
+    "file_ids"/"positions" the file and position of every row, first those of
+    the sorted ages and then the rows with an unknown age (NaN or -99).
+
+    Without `directory` the cohort keeps `frames` to filter them later. With
+    it, the positions point into the workbooks' cached frames, which
+    select_aao fetches again; the cohort holds no frame and can be kept
+    across requests.
+    """
+    files = []
+    kept_frames = []
+    ages = []
+    known_rows = []
+    unknown_rows = []
+    for filename, df in frames:
+        try:
+            selected = select_rows(df, plan, columns=["aao"])
+            values = selected["aao"]
+            known = (values.notna() & (values != -99)).to_numpy()
+            if directory is not None:
+                df = get_cached_dataframe(os.path.join(directory, filename))
+        except Exception as e:
+            logger.error(f"Error processing file {filename}: {str(e)}")
+            continue
+
+        positions = df.index.get_indexer(selected.index)
+        file_id = np.full(len(positions), len(files))
+        files.append(filename)
+        if directory is None:
+            kept_frames.append(df)
+        ages.append(values.to_numpy()[known])
+        known_rows.append((file_id[known], positions[known]))
+        unknown_rows.append((file_id[~known], positions[~known]))
+
+    if not files:
+        empty = np.empty(0, dtype=np.int64)
+        return {
+            "directory": directory, "files": [], "frames": [],
+            "ages": np.empty(0), "file_ids": empty, "positions": empty,
+        }
+
+    ages = np.concatenate(ages)
+    order = np.argsort(ages, kind="stable")
+    rows = known_rows + unknown_rows
+    file_ids = np.concatenate([file_id for file_id, _ in rows])
+    positions = np.concatenate([position for _, position in rows])
+    known_count = len(ages)
+    file_ids[:known_count] = file_ids[:known_count][order]
+    positions[:known_count] = positions[:known_count][order]
+    return {
+        "directory": directory, "files": files, "frames": kept_frames,
+        "ages": ages[order], "file_ids": file_ids, "positions": positions,
+    }
+
+
+def _cohort_frame(cohort, file_id):
+    if cohort["directory"] is None:
+        return cohort["frames"][file_id]
+    return get_cached_dataframe(os.path.join(cohort["directory"], cohort["files"][file_id]))
+
+
+def get_aao_cohort(directory, disease_abbrev, gene, chart, plan):
+    """
+    build_aao_cohort of the cohort's workbooks, kept until the directory's
+    master table is rebuilt. At most AAO_COHORT_CACHE_SIZE cohorts are kept.
+    """
+    master = get_master_table(directory)
+    key = (directory, disease_abbrev, gene, chart)
+    with _lock:
+        # Cohorts of an earlier master table are never served again
+        for old_key, entry in list(_cohorts.items()):
+            if old_key[0] == directory and entry["master"] is not master:
+                del _cohorts[old_key]
+        entry = _cohorts.get(key)
+        if entry is not None:
+            _cohorts.move_to_end(key)
+            return entry["cohort"]
+
+    frames = get_cohort_frames(directory, gene, disease_abbrev)
+    entry = {"master": master, "cohort": build_aao_cohort(frames, plan, directory)}
+    logger.info(
+        f"Built {chart} AAO cohort of {disease_abbrev} - {gene}: "
+        f"{len(entry['cohort']['positions'])} patients"
+    )
+    with _lock:
+        _cohorts[key] = entry
+        _cohorts.move_to_end(key)
+        while len(_cohorts) > AAO_COHORT_CACHE_SIZE:
+            _cohorts.popitem(last=False)
+    return entry["cohort"]
+
+
+def select_aao(cohort, filter_criteria=None, aao=None, countries=None, mutations=None):
+    """
+    (sorted known ages, number of patients, number with an unknown age) of the
+    cohort rows that pass apply_filter's filters. A workbook the filters fail
+    on is left out, as the charts always skipped it.
+    """
+    ages = cohort["ages"]
+    file_ids = cohort["file_ids"]
+    filters = user_filters(filter_criteria, aao, countries, mutations)
+    if filters is None:
+        return ages, len(file_ids), len(file_ids) - len(ages)
+
+    keep = np.zeros(len(file_ids), dtype=bool)
+    for file_id, filename in enumerate(cohort["files"]):
+        rows = file_ids == file_id
+        try:
+            mask = filters(_cohort_frame(cohort, file_id))
+        except Exception as e:
+            logger.error(f"Error filtering file {filename}: {str(e)}")
+            continue
+        keep[rows] = True if mask is None else np.asarray(mask, dtype=bool)[cohort["positions"][rows]]
+
+    known = keep[: len(ages)]
+    return ages[known], int(keep.sum()), int(keep[len(ages):].sum())
+
+
+def decade_counts(ages):
+    """Number of ages in 0-9, 10-19, ..., 90-99 (ages outside 0-99 are not counted)."""
+    ages = ages[(ages >= 0) & (ages <= 99)]
+    return np.bincount((ages // 10).astype(np.int64), minlength=10).tolist()
+
+
+def ecdf_points(ages):
+    """
+    Step line of the empirical distribution of sorted ages: every distinct age x
+    in 0-99.9 adds [x, previous percent rank] and [x + 0.1, percent of ages <= x].
+    """
+    values = np.unique(ages)
+    values = values[(values >= 0.0) & (values <= 99.9)]
+    ranks = np.searchsorted(ages, values, side="right") * 100.0 / len(ages)
+
+    points = [[0, 0]]
+    previous = 0
+    for x, rank in zip(values.tolist(), ranks.tolist()):
+        rank = round(rank, 2)
+        points.append([x, previous])
+        points.append([x + 0.1, rank])
+        previous = rank
+    points.append([100, previous])
+    return points
@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import gene_dashboard
+from cohort_manifest import get_master_table
+
+logger = logging.getLogger(__name__)
+
+# directory -> {"master": master table the views were built from, "charts": {(disease_abbrev, gene): {chart: bytes}}}
+_views = {}
+
+# Directory of the symptom_categories files the symptom charts read
+PROPERTIES_DIRECTORY = "properties"
+
+# Directories whose views are being rebuilt in the background
+_building = set()
+# Directories whose running rebuild may have read outdated properties; it runs once more
+_outdated = set()
+_lock = threading.Lock()
+
+
+def cohort_pairs(master):
+    """(disease_abbrev, gene) of every gene page of a directory, disease upper-cased as the charts compare it."""
+    return sorted(
+        {
+            (disease.upper(), gene)
+            for gene, by_disease in master["genes"].items()
+            for disease in by_disease
+            if isinstance(gene, str) and isinstance(disease, str)
+        }
+    )
+
+
+def _render(data):
+    # The bytes FastAPI would send for the same return value
+    return JSONResponse(content=jsonable_encoder(data)).body
+
+
+def build_views(directory):
+    """
+    Build the unfiltered payload of every dashboard chart for every gene page of
+    a directory, and swap them in together. The views belong to the master
+    table they were built from and are not served once it has been rebuilt.
+    """
+    started = time.perf_counter()
+    master = get_master_table(directory)
+    charts = {}
+    for disease_abbrev, gene in cohort_pairs(master):
+        payloads = {}
+        for entry in gene_dashboard.iter_gene_dashboard(disease_abbrev, gene, directory=directory):
+            if "error" in entry:
+                continue
+            try:
+                payloads[entry["chart"]] = _render(entry["data"])
+            except ValueError as e:
+                # Not JSON compliant (NaN): the endpoint computes and reports it as before
+                logger.error(f"Cannot prebuild {entry['chart']} of {disease_abbrev} - {gene}: {str(e)}")
+        charts[(disease_abbrev, gene)] = payloads
+
+    with _lock:
+        if directory in _outdated:
+            # Read properties that changed meanwhile; _rebuild builds them again
+            return
+        _views[directory] = {"master": master, "charts": charts}
+    logger.info(
+        f"Built chart views of {directory}: {len(charts)} gene pages "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+def _rebuild(directory):
+    while True:
+        try:
+            build_views(directory)
+        except Exception as e:
+            logger.error(f"Building chart views of {directory} failed: {str(e)}")
+        with _lock:
+            if directory not in _outdated:
+                _building.discard(directory)
+                return
+            _outdated.discard(directory)
+
+
+def start_rebuild(directory):
+    """Rebuild the views of a directory in a background thread, unless that is already running."""
+    with _lock:
+        if directory in _building:
+            return None
+        _building.add(directory)
+    thread = threading.Thread(
+        target=_rebuild, args=(directory,), name=f"chart-views-{directory}", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def get_view(directory, disease_abbrev, gene, chart):
+    """
+    Prebuilt JSON bytes of an unfiltered chart, or None if there is none yet.
+    Views of an outdated cohort are not served; they are rebuilt in the background.
+    """
+    view = _views.get(directory)
+    if view is None:
+        return None
+    try:
+        current = get_master_table(directory)
+    except Exception:
+        return None
+    if view["master"] is not current:
+        start_rebuild(directory)
+        return None
+    return view["charts"].get((disease_abbrev, gene), {}).get(chart)
+
+
+def properties_changed(path):
+    """
+    Change listener for dataset_watcher. The symptom charts also depend on the
+    symptom_categories files, which are rewritten without rebuilding a master
+    table, so a change there drops every directory's views at once and
+    rebuilds them in the background.
+    """
+    if os.path.normpath(os.path.dirname(path)) != PROPERTIES_DIRECTORY:
+        return
+    with _lock:
+        directories = set(_views) | _building
+        _outdated.update(_building)
+    for directory in directories:
+        _views.pop(directory, None)
+        start_rebuild(directory)
@@ -1,13 +1,32 @@
-import pandas as pd
-import os
 import logging
-from utils import get_cached_dataframe, apply_filter
-from scipy.stats import describe
+from aao_arrays import build_aao_cohort, ecdf_points, get_aao_cohort, select_aao
+from query_plan import (
+    affected_if_present,
+    in_cohort,
+    included_if_present,
+    not_benign,
+)
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+def _known_aao(df):
+    if "aao" not in df.columns:
+        return None
+    return df["aao"].notnull() & (df["aao"] != -99)
+
+
+def _aao_plan(disease_abbrev, gene):
+    return [
+        included_if_present,
+        in_cohort(disease_abbrev, gene, disease_optional=True),
+        affected_if_present,
+        not_benign,
+        _known_aao,
+    ]
+
+
 def _fetch_aao_data(
     disease_abbrev: str,
     gene: str,
@@ -16,79 +35,18 @@ def _fetch_aao_data(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
-    aao_data = []
-
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue  # Skip temporary Excel files
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                logger.info(
-                    f"Processing file: {filename}, Initial DataFrame shape: {df.shape}"
-                )
-
-                # Safely filter based on mdsgene_decision
-                if "mdsgene_decision" in df.columns:
-                    df = df[df["mdsgene_decision"] == "IN"]
-                logger.info(f"After mdsgene_decision filter: {df.shape}")
-
-                # Only apply the filter if filter_criteria, country, or mutation is provided
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-                logger.info(f"After apply_filter: {df.shape}")
-
-                # Safely filter based on disease_abbrev and gene
-                disease_mask = (
-                    df["disease_abbrev"] == disease_abbrev
-                    if "disease_abbrev" in df.columns
-                    else pd.Series(True, index=df.index)
-                )
-                gene_mask = (
-                    (df["gene1"] == gene)
-                    | (df["gene2"] == gene)
-                    | (df["gene3"] == gene)
-                )
-                filtered_df = df[disease_mask & gene_mask]
-                logger.info(
-                    f"After disease_abbrev and gene filter: {filtered_df.shape}"
-                )
-
-                # Safely apply additional filters
-                status_mask = (
-                    filtered_df["status_clinical"] != "clinically unaffected"
-                    if "status_clinical" in filtered_df.columns
-                    else pd.Series(True, index=filtered_df.index)
-                )
-                pathogenicity_mask = (
-                    (filtered_df["pathogenicity1"] != "benign")
-                    & (filtered_df["pathogenicity2"] != "benign")
-                    & (filtered_df["pathogenicity3"] != "benign")
-                )
-                aao_mask = (
-                    (filtered_df["aao"].notnull() & (filtered_df["aao"] != -99))
-                    if "aao" in filtered_df.columns
-                    else pd.Series(True, index=filtered_df.index)
-                )
-
-                filtered_df = filtered_df[status_mask & pathogenicity_mask & aao_mask]
-                logger.info(f"After additional filters: {filtered_df.shape}")
-
-                # Collect age at onset data
-                if "aao" in filtered_df.columns:
-                    aao_data.extend(filtered_df["aao"].dropna().tolist())
-
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {str(e)}")
-                continue
+
+    # The cohort's ages are sorted once; the filters only mask its rows
+    if frames is None:
+        cohort = get_aao_cohort(
+            directory, disease_abbrev, gene, "empirical_distribution", _aao_plan(disease_abbrev, gene)
+        )
+    else:
+        cohort = build_aao_cohort(frames, _aao_plan(disease_abbrev, gene))
+    aao_data, _, _ = select_aao(cohort, filter_criteria, aao, countries, mutations)
 
     logger.info(f"Total aao_data points: {len(aao_data)}")
     return aao_data
@@ -102,22 +60,20 @@ def generate_aao_empirical_distribution(
     aao: float = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     aao_data = _fetch_aao_data(
-        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory, frames
     )
 
-    # Remove any remaining -99 values
-    aao_data = [x for x in aao_data if x != -99]
-
-    if not aao_data:
+    if not len(aao_data):
         logger.warning(
             f"No valid data found for disease_abbrev: {disease_abbrev}, gene: {gene}"
         )
         return None
 
-    aao_data.sort()
-    stats_by_years = describe(aao_data)
+    # aao_data is sorted
+    minmax = (aao_data[0], aao_data[-1])
 
     # Check if we have enough data points for percentiles
     if len(aao_data) >= 4:
@@ -128,25 +84,7 @@ def generate_aao_empirical_distribution(
     else:
         hist_aao_25_percent = hist_aao_median = hist_aao_75_percent = None
 
-    histogram_data = []
-    start_from_0years = [0, 0]
-    histogram_data.append(start_from_0years)
-    prev = start_from_0years
-    prev_value = -1
-
-    for x in aao_data:
-        if prev_value < x:
-            prev_value = x
-        else:
-            continue
-        if not (0.0 <= x <= 99.9):
-            continue
-        pp = (sum(1 for a in aao_data if a <= x) * 100.0) / len(aao_data)
-        histogram_data.append([x, prev[1]])
-        histogram_data.append([x + 0.1, round(pp, 2)])
-        prev = [x + 0.1, round(pp, 2)]
-
-    histogram_data.append([100, prev[1]])
+    histogram_data = ecdf_points(aao_data)
 
     # Prepare the chart configuration
     chart_config = {
@@ -156,7 +94,7 @@ def generate_aao_empirical_distribution(
         "chart": {"type": "line"},
         "title": {"text": "Empirical distribution of age at onset"},
         "subtitle": {
-            "text": f"Median: {hist_aao_median}; 25th/75th perc.: {hist_aao_25_percent}/{hist_aao_75_percent}; Range: {stats_by_years.minmax[0]:.2f}-{stats_by_years.minmax[1]:.2f} yrs."
+            "text": f"Median: {hist_aao_median}; 25th/75th perc.: {hist_aao_25_percent}/{hist_aao_75_percent}; Range: {minmax[0]:.2f}-{minmax[1]:.2f} yrs."
         },
         "xAxis": {"title": {"text": "Age at onset"}, "min": 0, "max": 100},
         "yAxis": {
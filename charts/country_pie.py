@@ -1,7 +1,8 @@
 import pandas as pd
-import os
 import logging
-from utils import get_cached_dataframe, apply_filter, CHART_COLORS
+from utils import count_values, CHART_COLORS
+from cohort_manifest import get_cohort_frames
+from query_plan import affected, in_cohort, included_if_present, not_benign, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,7 @@ def _fetch_country_data(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
     country_counts = {}
@@ -24,81 +26,52 @@ def _fetch_country_data(
         f"Starting country data fetch with parameters: disease={disease_abbrev}, gene={gene}"
     )
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            logger.debug(f"Processing file: {filename}")
+            logger.debug(f"Initial dataframe rows: {len(df)}")
+
+            # Ensure all column names are lowercase for consistency
+            df.columns = [col.lower() for col in df.columns]
+
+            filtered_df = select_rows(
+                df,
+                [
+                    included_if_present,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                    in_cohort(disease_abbrev, gene),
+                    affected,
+                    not_benign,
+                ],
+                columns=["country"],
+            )
+            logger.debug(f"After filters: {len(filtered_df)} rows")
+
+            total_count += len(filtered_df)
+
+            # Process country data
+            country_data = count_values(filtered_df["country"], dropna=False).to_dict()
+            logger.debug(f"Country data from file: {country_data}")
+
+            for c, count in country_data.items():
+                # Проверяем только на null/nan значения, так как -99 уже заменены
+                if pd.notna(c):
+                    country_counts[c] = country_counts.get(c, 0) + count
+                    logger.debug(f"Added {count} patients from country {c}")
+                else:
+                    missing_count += count
+                    logger.debug(f"Added {count} to missing count (country={c})")
+
+        except KeyError as e:
+            if "country" in str(e):
+                logger.debug(f"Columns in {filename}: {df.columns.tolist()}")
+            logger.error(f"Error accessing data in file {filename}: {str(e)}")
+            continue
+        except Exception as e:
+            logger.error(f"Error processing file {filename}: {str(e)}")
             continue
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                logger.debug(f"Processing file: {filename}")
-                df = get_cached_dataframe(file_path)
-                logger.debug(f"Initial dataframe rows: {len(df)}")
-
-                # Ensure all column names are lowercase for consistency
-                df.columns = [col.lower() for col in df.columns]
-
-                # Basic filtering
-                if "mdsgene_decision" in df.columns:
-                    df = df[df["mdsgene_decision"] == "IN"]
-                logger.debug(f"After ensemble decision filter: {len(df)} rows")
-
-                # Apply user filters
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-                logger.debug(f"After applying filters: {len(df)} rows")
-
-                # Disease and gene filtering
-                disease_mask = df["disease_abbrev"] == disease_abbrev
-                gene_mask = (
-                    (df["gene1"] == gene)
-                    | (df["gene2"] == gene)
-                    | (df["gene3"] == gene)
-                )
-                filtered_df = df[disease_mask & gene_mask]
-                logger.debug(f"After disease and gene filter: {len(filtered_df)} rows")
-
-                if len(filtered_df) == 0:
-                    continue
-
-                # Clinical and pathogenicity filtering
-                clinical_mask = (
-                    filtered_df["status_clinical"] != "clinically unaffected"
-                )
-                pathogenicity_mask = (
-                    (filtered_df["pathogenicity1"] != "benign")
-                    & (filtered_df["pathogenicity2"] != "benign")
-                    & (filtered_df["pathogenicity3"] != "benign")
-                )
-                filtered_df = filtered_df[clinical_mask & pathogenicity_mask]
-
-                total_count += len(filtered_df)
-
-                # Process country data
-                country_data = filtered_df["country"].value_counts(dropna=False).to_dict()
-                logger.debug(f"Country data from file: {country_data}")
-
-                for c, count in country_data.items():
-                    # Проверяем только на null/nan значения, так как -99 уже заменены
-                    if pd.notna(c):
-                        country_counts[c] = country_counts.get(c, 0) + count
-                        logger.debug(f"Added {count} patients from country {c}")
-                    else:
-                        missing_count += count
-                        logger.debug(f"Added {count} to missing count (country={c})")
-
-            except KeyError as e:
-                if "country" in str(e):
-                    logger.debug(f"Columns in {filename}: {df.columns.tolist()}")
-                logger.error(f"Error accessing data in file {filename}: {str(e)}")
-                continue
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {str(e)}")
-                continue
 
     logger.info(f"Final country counts: {country_counts}")
     logger.info(f"Total patients: {total_count}, Missing country data: {missing_count}")
@@ -114,9 +87,10 @@ def generate_country_pie_chart(
     aao: float = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     country_counts, missing_count, total_count = _fetch_country_data(
-        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory, frames
     )
 
     if not country_counts and total_count == 0:
@@ -1,12 +1,74 @@
-import re
 import pandas as pd
 import os
 import logging
-from utils import fetch_duration_data
 import numpy as np
+from cohort_manifest import get_gene_frames
+from durations import DURATION_UNITS, count_duration_units
+from query_plan import in_rows, included_if_present, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
+# Key of fetch_duration_data -> column
+DURATION_COLUMNS = {
+    "shortest": "duration_of_shortest_attack",
+    "longest": "duration_of_longest_attack",
+}
+
+
+def fetch_duration_data(
+    genes,
+    filter_criteria=None,
+    aao=None,
+    countries=None,
+    mutations=None,
+    directory="excel",
+):
+    """
+    Fetch duration data for the specified genes as raw strings.
+
+    Parameters:
+    - genes: List of genes to include
+    - filter_criteria, aao, countries, mutations: Filtering parameters
+    - directory: Directory containing Excel files
+
+    Returns:
+    - Dictionary with duration data for each gene: {'GENE': {'shortest': [str,...], 'longest': [str,...], 'shortest_отсутствует': [str,...], 'longest_отсутствует': [str,...]}}
+    """
+    duration_data = {gene: {"shortest": [], "longest": [], "shortest_отсутствует": [], "longest_отсутствует": []} for gene in genes}
+
+    # Patients of all requested genes, one entry per patient and gene they carry
+    for filename, df, carriers in get_gene_frames(directory, genes):
+        try:
+            df = select_rows(
+                df,
+                [
+                    in_rows(carriers["row"]),
+                    included_if_present,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                ],
+                columns=list(DURATION_COLUMNS.values()),
+            )
+            carriers = carriers[carriers["row"].isin(df.index)]
+
+            for gene, rows in carriers.groupby("gene", sort=False)["row"]:
+                for key, column in DURATION_COLUMNS.items():
+                    if column in df.columns:
+                        values = df.loc[rows, column]
+                        # Get all values that are not NaN
+                        duration_data[gene][key].extend(values.dropna().astype(str).tolist())
+                        # The NaN values go to the missing elements list
+                        missing = int(values.isna().sum())
+                    else:
+                        # If the column doesn't exist, all rows are considered missing
+                        missing = len(rows)
+                    duration_data[gene][f"{key}_отсутствует"].extend(["отсутствует"] * missing)
+        except Exception as e:
+            logger.error(f"Error fetching duration from {filename}: {e}")
+            continue
+
+    return duration_data
+
+
 def generate_duration_chart(
     genes,
     filter_criteria=None,
@@ -43,66 +105,16 @@ def generate_duration_chart(
 
     missing_percentage = (missing_entries / (total_entries + missing_entries) * 100) if (total_entries + missing_entries) > 0 else 0
 
-    # 1) Ваши данные
-    inner = list(data.values())[0]
-    combined = set(inner['shortest']) | set(inner['longest'])
-
-    # 2) Предопределённый порядок от меньшей к большей
-    units_order = [
-        'second', 'seconds',
-        'minute', 'minutes', 'min',
-        'hour', 'hours', 'hr',
-        'day', 'days',
-        'week', 'weeks',
-        'month', 'months',
-        'year', 'years'
-    ]
-
-    # 5) Функция, которая находит индекс по любому варианту вхождения единицы
-    synonyms = {
-        'seconds': ['sec', r'\b\d+\s*s\b'],
-        'minutes': ['min', r'\b\d+\s*m\b'],
-        'hours': ['hr', r'\b\d+\s*h\b'],
-        'days': ['day', 'days'],
-        'weeks': ['week', 'weeks'],
-        'months': ['month', 'months'],
-        'years': ['year', 'years']
-    }
-
-    # Use synonyms.keys as the base for categories
-    sorted_units = list(synonyms.keys())
-
-    # 4) Строим словарь «категория → индекс»
-    category_to_index = {cat: idx for idx, cat in enumerate(sorted_units)}
-
-    def category_index(text):
-        txt = text.lower()
-        # ищем по точному названию из sorted_units
-        for cat, idx in category_to_index.items():
-            if re.search(rf'\b{re.escape(cat)}\b', txt):
-                return idx
-            # пробуем синонимы/аббревиатуры
-            for syn in synonyms.get(cat, []):
-                if re.search(syn, txt):
-                    return idx
-        # дефолтное значение, если ничего не подошло
-        return None
+    # Unit buckets from short to long, see durations.DURATION_UNITS
+    sorted_units = list(DURATION_UNITS)
 
-    # 6) А теперь считаем счётчики автоматически
-    n = len(sorted_units)
-    shortest_counts = [0] * n
-    longest_counts = [0] * n
-
-    # Calculate counts for all genes
-    for gene, vals in data.items():
-        for txt in vals.get("shortest", []):
-            idx = category_index(txt)
-            if idx is not None:
-                shortest_counts[idx] += 1
-        for txt in vals.get("longest", []):
-            idx = category_index(txt)
-            if idx is not None:
-                longest_counts[idx] += 1
+    # 6) А теперь считаем счётчики: each distinct text is classified once
+    shortest_counts = count_duration_units(
+        txt for vals in data.values() for txt in vals.get("shortest", [])
+    )
+    longest_counts = count_duration_units(
+        txt for vals in data.values() for txt in vals.get("longest", [])
+    )
 
     # Пример вывода
     print("Ordered categories:", sorted_units)
@@ -1,7 +1,15 @@
 import pandas as pd
-import os
 import logging
-from utils import get_cached_dataframe, apply_filter, CHART_COLORS
+from utils import CHART_COLORS
+from cohort_manifest import get_cohort_frames
+from query_plan import (
+    affected_if_present,
+    in_cohort,
+    included_if_present,
+    not_benign,
+    select_rows,
+    user_filters,
+)
 from collections import Counter
 
 logger = logging.getLogger(__name__)
@@ -58,77 +66,42 @@ def generate_ethnicity_pie_chart(
     aao: float = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
     ethnicity_data = []
     total_count = 0
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue  # Skip temporary Excel files
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                logger.info(
-                    f"Processing file: {filename}, Initial DataFrame shape: {df.shape}"
-                )
-
-                # Safely filter based on mdsgene_decision
-                if "mdsgene_decision" in df.columns:
-                    df = df[df["mdsgene_decision"] == "IN"]
-                logger.info(f"After mdsgene_decision filter: {df.shape}")
-
-                # Only apply the filter if filter_criteria, country, or mutation is provided
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-                logger.info(f"After apply_filter: {df.shape}")
-
-                # Safely filter based on disease_abbrev and gene
-                disease_mask = (
-                    df["disease_abbrev"] == disease_abbrev
-                    if "disease_abbrev" in df.columns
-                    else pd.Series(True, index=df.index)
-                )
-                gene_mask = (
-                    (df["gene1"] == gene)
-                    | (df["gene2"] == gene)
-                    | (df["gene3"] == gene)
-                )
-                filtered_df = df[disease_mask & gene_mask]
-                logger.info(
-                    f"After disease_abbrev and gene filter: {filtered_df.shape}"
-                )
-
-                # Safely apply additional filters
-                status_mask = (
-                    filtered_df["status_clinical"] != "clinically unaffected"
-                    if "status_clinical" in filtered_df.columns
-                    else pd.Series(True, index=filtered_df.index)
-                )
-                pathogenicity_mask = (
-                    (filtered_df["pathogenicity1"] != "benign")
-                    & (filtered_df["pathogenicity2"] != "benign")
-                    & (filtered_df["pathogenicity3"] != "benign")
-                )
-
-                filtered_df = filtered_df[status_mask & pathogenicity_mask]
-                logger.info(f"After additional filters: {filtered_df.shape}")
-
-                # Map ethnicities using ancestryMapper and collect data
-                if "ethnicity" in filtered_df.columns:
-                    mapped_ethnicities = filtered_df["ethnicity"].apply(map_ethnicity)
-                    ethnicity_data.extend(mapped_ethnicities.dropna().tolist())
-                total_count += len(filtered_df)
-
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {str(e)}")
-                continue
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            logger.info(
+                f"Processing file: {filename}, Initial DataFrame shape: {df.shape}"
+            )
+
+            filtered_df = select_rows(
+                df,
+                [
+                    included_if_present,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                    in_cohort(disease_abbrev, gene, disease_optional=True),
+                    affected_if_present,
+                    not_benign,
+                ],
+                columns=["ethnicity"],
+            )
+            logger.info(f"After filters: {filtered_df.shape}")
+
+            # Map ethnicities using ancestryMapper and collect data
+            if "ethnicity" in filtered_df.columns:
+                mapped_ethnicities = filtered_df["ethnicity"].apply(map_ethnicity)
+                ethnicity_data.extend(mapped_ethnicities.dropna().tolist())
+            total_count += len(filtered_df)
+
+        except Exception as e:
+            logger.error(f"Error processing file {filename}: {str(e)}")
+            continue
 
     logger.info(f"Total ethnicity data points: {len(ethnicity_data)}")
 
@@ -1,28 +1,37 @@
-import pandas as pd
 import os
 import logging
 import json
 import re
-from utils import get_cached_dataframe, apply_filter
+from utils import count_values
+from cohort_manifest import get_cohort_frames
+from query_plan import affected, in_cohort, included, not_benign, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
+# symptom_categories file -> symptom_name_table of it
+_name_tables = {}
+
+
+def _symptom_categories_path(directory, disease_abbrev=None, gene=None):
+    # Construct filename with disease and gene postfix if provided
+    base_filename = "symptom_categories"
+    if disease_abbrev and gene:
+        filename = f"{base_filename}_{disease_abbrev.upper()}_{gene.upper()}.json"
+    else:
+        filename = f"{base_filename}.json"
+
+    file_path = os.path.join(directory, filename)
+
+    # If specific file doesn't exist, fall back to default
+    if not os.path.exists(file_path):
+        file_path = os.path.join(directory, "symptom_categories.json")
+    return file_path
+
 
 def load_symptom_categories(directory="properties", disease_abbrev=None, gene=None):
     """Load and flatten the symptom categories from JSON"""
     try:
-        # Construct filename with disease and gene postfix if provided
-        base_filename = "symptom_categories"
-        if disease_abbrev and gene:
-            filename = f"{base_filename}_{disease_abbrev.upper()}_{gene.upper()}.json"
-        else:
-            filename = f"{base_filename}.json"
-
-        file_path = os.path.join(directory, filename)
-
-        # If specific file doesn't exist, fall back to default
-        if not os.path.exists(file_path):
-            file_path = os.path.join(directory, "symptom_categories.json")
+        file_path = _symptom_categories_path(directory, disease_abbrev, gene)
 
         with open(file_path, "r") as f:
             categories = json.load(f)
@@ -42,6 +51,38 @@ def load_symptom_categories(directory="properties", disease_abbrev=None, gene=No
         return {}
 
 
+def symptom_name_table(directory="properties", disease_abbrev=None, gene=None):
+    """
+    {"mapping": load_symptom_categories, "names": raw symptom -> display name}
+    of a properties file, kept until the file's mtime changes. The names fill
+    up as symptoms are first seen, so each distinct value of the cohort is
+    standardized once.
+    """
+    file_path = os.path.normpath(_symptom_categories_path(directory, disease_abbrev, gene))
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        mtime = None
+
+    table = _name_tables.get(file_path)
+    if table is None or table["mtime"] != mtime:
+        table = {
+            "mtime": mtime,
+            "mapping": load_symptom_categories(directory, disease_abbrev, gene),
+            "names": {},
+        }
+        _name_tables[file_path] = table
+    return table
+
+
+def forget_name_table(path):
+    """
+    Change listener for dataset_watcher: drop the table of a changed or removed
+    properties file, so the memo only holds files that still exist.
+    """
+    _name_tables.pop(os.path.normpath(path), None)
+
+
 def standardize_symptom(symptom):
     """Standardize symptom names by removing common variations and special characters"""
     if not isinstance(symptom, str):
@@ -82,6 +123,14 @@ def get_standardized_symptom_name(symptom, symptom_mapping):
     return standardized.title()  # Return capitalized version if no mapping found
 
 
+def display_symptom_name(symptom, table):
+    """get_standardized_symptom_name, memoized in a symptom_name_table"""
+    names = table["names"]
+    if symptom not in names:
+        names[symptom] = get_standardized_symptom_name(symptom, table["mapping"])
+    return names[symptom]
+
+
 def _fetch_initial_symptoms_data(
     disease_abbrev: str,
     gene: str,
@@ -90,6 +139,7 @@ def _fetch_initial_symptoms_data(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
     initial_symptoms = {}
@@ -97,90 +147,60 @@ def _fetch_initial_symptoms_data(
     patients_with_missing_data = 0
 
     # Load symptom categories mapping with disease and gene
-    symptom_mapping = load_symptom_categories("properties", disease_abbrev, gene)
-
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                df = df[df["mdsgene_decision"] == "IN"]
-
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-                filtered_df = pd.concat(
-                    [
-                        df[
-                            (df["disease_abbrev"] == disease_abbrev)
-                            & (df["gene1"] == gene)
-                        ],
-                        df[
-                            (df["disease_abbrev"] == disease_abbrev)
-                            & (df["gene2"] == gene)
-                        ],
-                        df[
-                            (df["disease_abbrev"] == disease_abbrev)
-                            & (df["gene3"] == gene)
-                        ],
-                    ]
-                ).drop_duplicates()
-
-                filtered_df = filtered_df[
-                    (filtered_df["status_clinical"] != "clinically unaffected")
-                    & (filtered_df["pathogenicity1"] != "benign")
-                    & (filtered_df["pathogenicity2"] != "benign")
-                    & (filtered_df["pathogenicity3"] != "benign")
-                ]
-
-                total_patients += len(filtered_df)
-
-                # Count patients with ALL initial symptoms missing or -99
-                missing_mask = (
-                    (
-                        filtered_df["initial_sympt1"].isna()
-                        | (filtered_df["initial_sympt1"] == -99)
-                    )
-                    & (
-                        filtered_df["initial_sympt2"].isna()
-                        | (filtered_df["initial_sympt2"] == -99)
-                    )
-                    & (
-                        filtered_df["initial_sympt3"].isna()
-                        | (filtered_df["initial_sympt3"] == -99)
-                    )
+    symptom_names = symptom_name_table("properties", disease_abbrev, gene)
+
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            filtered_df = select_rows(
+                df,
+                [
+                    included,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                    in_cohort(disease_abbrev, gene),
+                    affected,
+                    not_benign,
+                ],
+                columns=["initial_sympt1", "initial_sympt2", "initial_sympt3"],
+            )
+
+            total_patients += len(filtered_df)
+
+            # Count patients with ALL initial symptoms missing or -99
+            missing_mask = (
+                (
+                    filtered_df["initial_sympt1"].isna()
+                    | (filtered_df["initial_sympt1"] == -99)
+                )
+                & (
+                    filtered_df["initial_sympt2"].isna()
+                    | (filtered_df["initial_sympt2"] == -99)
                 )
-                patients_with_missing_data += missing_mask.sum()
-
-                # Process valid symptoms
-                for column in ["initial_sympt1", "initial_sympt2", "initial_sympt3"]:
-                    if column in filtered_df.columns:
-                        # Only count symptoms that are not null and not -99
-                        valid_symptoms = filtered_df[
-                            (~filtered_df[column].isna())  # исключаем числовые NaN
-                            & (filtered_df[column].astype(str).str.lower() != 'nan')  # исключаем строковые 'nan'
-                            & (filtered_df[column] != -99)  # исключаем -99
-                        ][column]
-
-                        symptom_counts = valid_symptoms.value_counts().to_dict()
-                        for symptom, count in symptom_counts.items():
-                            standardized_name = get_standardized_symptom_name(
-                                symptom, symptom_mapping
-                            )
-                            initial_symptoms[standardized_name] = (
-                                initial_symptoms.get(standardized_name, 0) + count
-                            )
-
-            except Exception as e:
-                logger.error(f"Error reading file {filename}: {str(e)}")
-                continue
+                & (
+                    filtered_df["initial_sympt3"].isna()
+                    | (filtered_df["initial_sympt3"] == -99)
+                )
+            )
+            patients_with_missing_data += missing_mask.sum()
+
+            # Process valid symptoms
+            for column in ["initial_sympt1", "initial_sympt2", "initial_sympt3"]:
+                if column in filtered_df.columns:
+                    # Count every distinct value once, then leave out the
+                    # string 'nan' and -99 (null values are not counted at all)
+                    symptom_counts = count_values(filtered_df[column]).to_dict()
+                    for symptom, count in symptom_counts.items():
+                        if str(symptom).lower() == "nan" or symptom == -99:
+                            continue
+                        standardized_name = display_symptom_name(symptom, symptom_names)
+                        initial_symptoms[standardized_name] = (
+                            initial_symptoms.get(standardized_name, 0) + count
+                        )
+
+        except Exception as e:
+            logger.error(f"Error reading file {filename}: {str(e)}")
+            continue
 
     # Add debug logging
     logger.debug(f"Total patients before percentage calc: {total_patients}")
@@ -199,13 +219,14 @@ def generate_initial_signs_symptoms(
     aao: float = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     # Проверка на PARK и GBA1
     is_park_gba1 = disease_abbrev == "PARK" and gene == "GBA1"
 
     initial_symptoms, total_patients, patients_with_missing_data = (
         _fetch_initial_symptoms_data(
-            disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+            disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory, frames
         )
     )
 
@@ -1,47 +1,12 @@
-import pandas as pd
-import os
 import logging
-from utils import get_cached_dataframe, apply_filter, RESPONSE_QUANTIFICATION
+from utils import count_values
+from cohort_manifest import get_cohort_frames
+from levodopa import LEVODOPA_CATEGORY, levodopa_category
+from query_plan import affected, in_cohort, included, not_benign, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
 
-def categorize_levodopa_response(row):
-    """Categorize levodopa response based on levodopa_response and response_quantification"""
-    levodopa_response = str(row["levodopa_response"]).lower()
-    response_quantification = str(row["response_quantification"]).lower()
-
-    # If levodopa_response is -99 or NaN, it's missing data
-    if levodopa_response == "-99" or pd.isna(row["levodopa_response"]):
-        return None
-
-    # If levodopa_response is "not treated", return "Not treated"
-    if levodopa_response == "not treated":
-        return "Not treated"
-
-    # If levodopa_response is "no", return "No"
-    if levodopa_response == "no":
-        return "No"
-
-    # If levodopa_response is "yes" and response_quantification is -99 or falsy,
-    # it's "Yes, unquantified"
-    if levodopa_response == "yes" and (
-        response_quantification == "-99"
-        or pd.isna(row["response_quantification"])
-        or response_quantification == ""
-    ):
-        return "Yes, unquantified"
-
-    # For "yes" responses with valid quantification
-    if levodopa_response == "yes":
-        # Loop through the dictionary to match response_quantification
-        for category, keywords in RESPONSE_QUANTIFICATION.items():
-            if any(keyword.lower() == response_quantification for keyword in keywords):
-                return category
-
-    return None  # Default case if nothing matches
-
-
 def _fetch_levodopa_response(
     disease_abbrev: str,
     gene: str,
@@ -50,76 +15,53 @@ def _fetch_levodopa_response(
     aao: float = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
     levodopa_response_counts = {}
     total_count = 0
     missing_count = 0
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue  # Skip temporary Excel files
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                df = df[df["mdsgene_decision"] == "IN"]
-
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-                filtered_df = df[
-                    (df["disease_abbrev"] == disease_abbrev)
-                    & (
-                        (df["gene1"] == gene)
-                        | (df["gene2"] == gene)
-                        | (df["gene3"] == gene)
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            filtered_df = select_rows(
+                df,
+                [
+                    included,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                    in_cohort(disease_abbrev, gene),
+                    affected,
+                    not_benign,
+                ],
+                columns=["levodopa_response", "response_quantification", LEVODOPA_CATEGORY],
+            )
+
+            total_count += len(filtered_df)
+
+            # Count cases where levodopa_response is missing or -99
+            missing_mask = filtered_df["levodopa_response"].isna() | (
+                filtered_df["levodopa_response"] == -99
+            )
+            missing_count += missing_mask.sum()
+
+            # Classified at load time, see levodopa.classify_levodopa_response
+            response_counts = count_values(levodopa_category(filtered_df)).to_dict()
+            for response, count in response_counts.items():
+                if response is not None:
+                    levodopa_response_counts[response] = (
+                        levodopa_response_counts.get(response, 0) + count
                     )
-                ]
-
-                filtered_df = filtered_df[
-                    (filtered_df["status_clinical"] != "clinically unaffected")
-                    & (filtered_df["pathogenicity1"] != "benign")
-                    & (filtered_df["pathogenicity2"] != "benign")
-                    & (filtered_df["pathogenicity3"] != "benign")
-                ]
-
-                total_count += len(filtered_df)
-
-                # Count cases where levodopa_response is missing or -99
-                missing_mask = filtered_df["levodopa_response"].isna() | (
-                    filtered_df["levodopa_response"] == -99
-                )
-                missing_count += missing_mask.sum()
-
-                # Apply categorization to all entries
-                filtered_df["levodopa_category"] = filtered_df.apply(
-                    categorize_levodopa_response, axis=1
-                )
-
-                # Count responses, excluding None
-                response_counts = (
-                    filtered_df["levodopa_category"].value_counts().to_dict()
-                )
-                for response, count in response_counts.items():
-                    if response is not None:
-                        levodopa_response_counts[response] = (
-                            levodopa_response_counts.get(response, 0) + count
-                        )
-
-                logger.debug(f"File {filename}:")
-                logger.debug(f"Total patients: {len(filtered_df)}")
-                logger.debug(f"Missing responses: {missing_mask.sum()}")
-                logger.debug(f"Response counts: {response_counts}")
-
-            except Exception as e:
-                logger.error(f"Error reading file {filename}: {str(e)}")
-                continue
+
+            logger.debug(f"File {filename}:")
+            logger.debug(f"Total patients: {len(filtered_df)}")
+            logger.debug(f"Missing responses: {missing_mask.sum()}")
+            logger.debug(f"Response counts: {response_counts}")
+
+        except Exception as e:
+            logger.error(f"Error reading file {filename}: {str(e)}")
+            continue
 
     return levodopa_response_counts, missing_count, total_count
 
@@ -132,9 +74,10 @@ def generate_levodopa_response(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     levodopa_response_counts, missing_count, total_count = _fetch_levodopa_response(
-        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory, frames
     )
 
     # Calculate missing percentage
@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
-import os
 import re
 import logging
-from utils import get_cached_dataframe, apply_filter, load_symptom_categories
+from utils import load_symptom_categories
+from cohort_manifest import get_cohort_frames
+from query_plan import in_cohort, included, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,23 @@ def get_symptom_columns(df):
     ]
 
 
+# Column order of tally_symptoms
+SYMPTOM_CATEGORIES = ["Present", "Absent", "Unknown"]
+
+
+def tally_symptoms(df, columns):
+    """
+    categorize_symptom counts of all symptom columns at once, as an array with
+    one [Present, Absent, Unknown] row per column: "yes" and "no" are compared
+    column-wise (on the codes for categoricals), everything else is Unknown.
+    """
+    block = df[columns]
+    present = (block == "yes").sum().to_numpy()
+    absent = (block == "no").sum().to_numpy()
+    unknown = len(block) - present - absent
+    return np.column_stack([present, absent, unknown])
+
+
 def categorize_symptom(value):
     if pd.isna(value) or value == -99:
         return "Unknown"
@@ -161,57 +180,42 @@ def fetch_symptom_data(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     disease_abbrev = disease_abbrev.upper()
     symptom_data = {}
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                df = df[df["mdsgene_decision"] == "IN"]
-
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-                filtered_df = df[
-                    (df["disease_abbrev"] == disease_abbrev)
-                    & (
-                        (df["gene1"] == gene)
-                        | (df["gene2"] == gene)
-                        | (df["gene3"] == gene)
-                    )
-                ]
-
-                symptom_columns = get_symptom_columns(filtered_df)
-
-                for column in symptom_columns:
-                    symptom_name = column.replace("_sympt", "").capitalize()
-                    categorized = (
-                        filtered_df[column].apply(categorize_symptom).value_counts()
-                    )
-
-                    if symptom_name not in symptom_data:
-                        symptom_data[symptom_name] = {
-                            "Present": 0,
-                            "Absent": 0,
-                            "Unknown": 0,
-                        }
-
-                    for category, count in categorized.items():
-                        symptom_data[symptom_name][category] += count
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            symptom_columns = get_symptom_columns(df)
+            filtered_df = select_rows(
+                df,
+                [
+                    included,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                    in_cohort(disease_abbrev, gene),
+                ],
+                columns=symptom_columns,
+            )
 
-            except Exception as e:
-                logger.error(f"Error reading file {filename}: {str(e)}")
-                continue
+            tally = tally_symptoms(filtered_df, symptom_columns)
+            for column, counts in zip(symptom_columns, tally):
+                symptom_name = column.replace("_sympt", "").capitalize()
+                if symptom_name not in symptom_data:
+                    symptom_data[symptom_name] = {
+                        "Present": 0,
+                        "Absent": 0,
+                        "Unknown": 0,
+                    }
+
+                for category, count in zip(SYMPTOM_CATEGORIES, counts):
+                    symptom_data[symptom_name][category] += int(count)
+
+        except Exception as e:
+            logger.error(f"Error reading file {filename}: {str(e)}")
+            continue
 
     return {k: v for k, v in symptom_data.items() if sum(v.values()) > 0}
 
@@ -224,6 +228,7 @@ def generate_symptoms_chart(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     # Проверка на PD и GBA
     is_pd_gba = disease_abbrev == "PARK" and gene == "GBA1"
@@ -231,7 +236,7 @@ def generate_symptoms_chart(
     categories_metadata = load_symptom_categories("properties", disease_abbrev, gene)
 
     symptom_data = fetch_symptom_data(
-        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory, frames
     )
 
     categorized_symptoms = {}
@@ -1,11 +1,88 @@
 import pandas as pd
 import os
 import logging
-from utils import fetch_treatment_response_data
 import numpy as np
+import treatments
+from cohort_manifest import get_gene_frames
+from query_plan import in_rows, included_if_present, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
+
+def fetch_treatment_response_data(
+    genes,
+    filter_criteria=None,
+    aao=None,
+    countries=None,
+    mutations=None,
+    directory="excel",
+):
+    """
+    Fetch treatment response data for the specified genes.
+
+    The responses of every workbook come from its treatment table (see
+    treatments.build_treatment_table), built once per workbook version; a request
+    only selects the patients of the genes that pass the filters and counts
+    their entries.
+
+    Parameters:
+    - genes: List of genes to include
+    - filter_criteria, aao, countries, mutations: Filtering parameters
+    - directory: Directory containing Excel files
+
+    Returns:
+    - Dictionary with treatment response data for each gene
+    """
+    # Columns ending with "_response", identified from the first dataframe
+    standard_treatment_columns = []
+
+    treatment_data = {gene: {} for gene in genes}
+
+    # Patients of all requested genes, one entry per patient and gene they carry
+    for filename, df, carriers in get_gene_frames(directory, genes):
+        file_path = os.path.join(directory, filename)
+        try:
+            logging.info(f"Processing file: {filename}, Initial DataFrame shape: {df.shape}")
+
+            selected = select_rows(
+                df,
+                [
+                    in_rows(carriers["row"]),
+                    included_if_present,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                ],
+                columns=[],
+            )
+            carriers = carriers[carriers["row"].isin(selected.index)]
+
+            # If this is the first file, identify columns ending with "_response"
+            if not standard_treatment_columns:
+                standard_treatment_columns = treatments.standard_treatment_columns(df)
+
+                # Initialize treatment_data with the identified standard treatment columns
+                for gene in genes:
+                    for col in standard_treatment_columns:
+                        treatment_data[gene][col] = {resp: 0 for resp in treatments.RESPONSE_TYPES}
+
+            counts = treatments.count_responses(
+                treatments.get_treatment_table(file_path, df),
+                carriers,
+                standard_treatment_columns + [treatments.OTHER_DRUG_COLUMN],
+            )
+            for gene, gene_counts in counts.items():
+                for treatment, responses in gene_counts.items():
+                    if treatment not in treatment_data[gene]:
+                        treatment_data[gene][treatment] = {resp: 0 for resp in treatments.RESPONSE_TYPES}
+                    for response, count in responses.items():
+                        treatment_data[gene][treatment][response] += count
+
+        except Exception as e:
+            logging.error(f"Error processing file {filename}: {str(e)}")
+            continue
+
+    return treatment_data
+
+
 def generate_treatment_response_chart(
     genes,
     filter_criteria=None,
@@ -1,11 +1,92 @@
 import pandas as pd
 import os
 import logging
-from utils import fetch_trigger_data
 import numpy as np
+from cohort_manifest import get_gene_frames
+from query_plan import in_rows, included_if_present, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
+
+def fetch_trigger_data(
+    genes,
+    filter_criteria=None,
+    aao=None,
+    countries=None,
+    mutations=None,
+    directory="excel",
+):
+    """
+    Fetch trigger data for the specified genes,
+    counting each raw category *and* missing entries.
+    """
+    # Define trigger columns for each gene (as per spec)
+    trigger_columns = {
+        "CACNA1A": [
+            "trigger",
+        ],
+        "KCNA1": [
+            "trigger",
+        ],
+        "PDHA1": [
+            "trigger",
+        ],
+        "SLC1A3": [
+            "trigger",
+        ],
+    }
+
+    # Initialize
+    trigger_data = {gene: {trig: {} for trig in trigger_columns.get(gene, [])} for gene in genes}
+    columns = list(dict.fromkeys(trig for gene in genes for trig in trigger_columns.get(gene, [])))
+    if not columns:
+        return trigger_data
+
+    # Patients of all requested genes, one entry per patient and gene they carry
+    for fname, df, carriers in get_gene_frames(directory, genes):
+        try:
+            df = select_rows(
+                df,
+                [
+                    in_rows(carriers["row"]),
+                    included_if_present,
+                    user_filters(filter_criteria, aao, countries, mutations),
+                ],
+                columns=columns,
+            )
+            carriers = carriers[carriers["row"].isin(df.index)]
+            carrier_genes = carriers["gene"].to_numpy()
+
+            for trig in columns:
+                if trig not in df.columns:
+                    continue
+                values = df.loc[carriers["row"], trig]
+                text = values.astype(str)
+
+                # 1) Count missing (“NaN” or “-99”)
+                missing = (values.isna() | (text == "-99")).to_numpy()
+                for gene, miss in pd.Series(missing).groupby(carrier_genes, sort=False).sum().items():
+                    if trig in trigger_data[gene]:
+                        trigger_data[gene][trig]["Missing"] = (
+                            trigger_data[gene][trig].get("Missing", 0) + int(miss)
+                        )
+
+                # 2) Count every other raw category
+                category = text.str.strip().to_numpy(dtype=object)
+                counted = values.notna().to_numpy() & (category != "") & (category != "-99")
+                counts = pd.Series(category[counted]).groupby(
+                    [carrier_genes[counted], category[counted]], sort=False
+                ).size()
+                for (gene, v), count in counts.items():
+                    if trig in trigger_data[gene]:
+                        trigger_data[gene][trig][v] = trigger_data[gene][trig].get(v, 0) + int(count)
+        except Exception as e:
+            logger.error(f"Error fetching triggers from {fname}: {e}")
+            continue
+
+    return trigger_data
+
+
 def generate_triggers_chart(
     genes,
     filter_criteria=None,
@@ -1,14 +1,21 @@
 from utils import COUNTRIES, CHART_COLORS
+import numpy as np
 import pandas as pd
-import os
 import logging
-from collections import Counter
-from utils import get_cached_dataframe, apply_filter
+from utils import count_values
+from cohort_manifest import get_cohort_frames
+from query_plan import affected, in_cohort, included, not_benign, select_rows, user_filters
 
 logger = logging.getLogger(__name__)
 
 
-def process_dataframe(df, disease_abbrev, gene):
+# Columns read by the map and by generate_mutation_data
+_WORLD_MAP_COLUMNS = ["country"] + [
+    f"mut{i}_{level}" for i in range(1, 4) for level in ("p", "c", "g")
+] + ["mut1_alias_original", "mut2_alias_original", "mut3_alias"]
+
+
+def process_dataframe(df, disease_abbrev, gene, filters=None):
     logger.debug(f"Processing dataframe for {disease_abbrev} - {gene}")
     logger.debug(f"Initial shape: {df.shape}")
 
@@ -16,24 +23,12 @@ def process_dataframe(df, disease_abbrev, gene):
     if "country" not in df.columns and "entry" in df.columns:
         df = df.rename(columns={"entry": "country"})
 
-    df = df[df["mdsgene_decision"] == "IN"]
-    logger.debug(f"After ensemble filter: {df.shape}")
-
-    filtered_df = pd.concat(
-        [
-            df[(df["disease_abbrev"] == disease_abbrev) & (df[f"gene{i}"] == gene)]
-            for i in range(1, 4)
-        ]
-    ).drop_duplicates()
-    logger.debug(f"After gene filter: {filtered_df.shape}")
-
-    filtered_df = filtered_df[
-        (filtered_df["status_clinical"] != "clinically unaffected")
-        & ~filtered_df[[f"pathogenicity{i}" for i in range(1, 4)]]
-        .isin(["benign"])
-        .any(axis=1)
-    ]
-    logger.debug(f"After clinical and pathogenicity filter: {filtered_df.shape}")
+    filtered_df = select_rows(
+        df,
+        [included, filters, in_cohort(disease_abbrev, gene), affected, not_benign],
+        columns=_WORLD_MAP_COLUMNS,
+    )
+    logger.debug(f"After filters: {filtered_df.shape}")
 
     unique_countries = filtered_df["country"].unique()
     logger.debug(f"Unique countries in filtered data: {unique_countries}")
@@ -41,65 +36,59 @@ def process_dataframe(df, disease_abbrev, gene):
     return filtered_df
 
 
-def generate_mutation_data(country_data):
-    mutation_counts = Counter()
-
-    # Handle mut1 and mut2
-    for i in range(1, 3):
-        alias_col = f"mut{i}_alias_original"
-        mutation_cols = [f"mut{i}_p", f"mut{i}_c", f"mut{i}_g"]
-
-        for _, row in country_data.iterrows():
-            # Get the first valid mutation value from p, c, or g columns
-            mutation_value = next(
-                (
-                    row[col]
-                    for col in mutation_cols
-                    if pd.notna(row[col]) and row[col] != -99 and row[col] != "-99"
-                ),
-                None,
-            )
+# Alias column of each mutation slot; mut3 has no "_original" variant
+_ALIAS_COLUMNS = {1: "mut1_alias_original", 2: "mut2_alias_original", 3: "mut3_alias"}
 
-            if mutation_value is not None:
-                alias = row[alias_col]
-                if pd.notna(alias) and alias != -99 and alias != "-99":
-                    mutation_counts[alias] += 1
-                else:
-                    mutation_counts[mutation_value] += 1
-
-    # Handle mut3 separately due to different alias column
-    alias_col = "mut3_alias"
-    mutation_cols = ["mut3_p", "mut3_c", "mut3_g"]
-
-    for _, row in country_data.iterrows():
-        mutation_value = next(
-            (
-                row[col]
-                for col in mutation_cols
-                if pd.notna(row[col]) and row[col] != -99 and row[col] != "-99"
-            ),
-            None,
-        )
 
-        if mutation_value is not None:
-            alias = row[alias_col]
-            if pd.notna(alias) and alias != -99 and alias != "-99":
-                mutation_counts[alias] += 1
-            else:
-                mutation_counts[mutation_value] += 1
+def _column_values(df, col):
+    # Sheets differ in which mutation columns they carry; a missing column counts as missing data
+    if col not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    return df[col].to_numpy(dtype=object)
+
+
+def _is_valid(values):
+    return pd.notna(values) & (values != -99) & (values != "-99")
+
+
+def build_mutation_table(df):
+    """
+    Long (country, mutation) table with one row per patient and mutation slot
+    that has an identifier: the slot's alias if it has one, otherwise its first
+    valid p., c. or g. identifier. Rows go slot by slot, patients in order.
+    """
+    countries = _column_values(df, "country")
+    slots = []
+    for i in range(1, 4):
+        mutation = np.full(len(df), None, dtype=object)
+        found = np.zeros(len(df), dtype=bool)
+        for level in ("p", "c", "g"):
+            values = _column_values(df, f"mut{i}_{level}")
+            take = ~found & _is_valid(values)
+            mutation[take] = values[take]
+            found |= take
+
+        alias = _column_values(df, _ALIAS_COLUMNS[i])
+        mutation = np.where(_is_valid(alias), alias, mutation)
+        slots.append(pd.DataFrame({"country": countries[found], "mutation": mutation[found]}))
+    return pd.concat(slots, ignore_index=True)
+
 
-    total_mutations = sum(mutation_counts.values())
+def _pie_data(counts):
+    """Top-10 pie of a Series mutation -> count, ties in order of first appearance."""
+    total_mutations = int(counts.sum())
 
     if total_mutations == 0:
         return []  # Return an empty list if there are no mutations
 
+    counts = counts.iloc[np.argsort(-counts.to_numpy(), kind="stable")]
     pie_data = [
-        {"name": str(mutation), "y": (count / total_mutations) * 100}
-        for mutation, count in mutation_counts.most_common(10)
+        {"name": str(mutation), "y": (int(count) / total_mutations) * 100}
+        for mutation, count in counts.iloc[:10].items()
     ]
 
-    if len(mutation_counts) > 10:
-        other_count = sum(dict(mutation_counts.most_common()[10:]).values())
+    if len(counts) > 10:
+        other_count = int(counts.iloc[10:].sum())
         pie_data.append(
             {
                 "name": "Other",
@@ -111,10 +100,25 @@ def generate_mutation_data(country_data):
     return pie_data
 
 
+def generate_mutation_data(country_data):
+    mutation_table = build_mutation_table(country_data)
+    return _pie_data(mutation_table.groupby("mutation", sort=False).size())
+
+
+def generate_mutation_data_by_country(all_data):
+    """generate_mutation_data of every country, from one groupby over the mutation table."""
+    mutation_table = build_mutation_table(all_data)
+    sizes = mutation_table.groupby(["country", "mutation"], sort=False).size()
+    return {
+        country: _pie_data(counts.droplevel("country"))
+        for country, counts in sizes.groupby(level="country", sort=False)
+    }
+
+
 def generate_world_map_data(all_data):
     logger.debug("Generating world map data")
     # Log raw country data
-    country_value_counts = all_data["country"].value_counts()
+    country_value_counts = count_values(all_data["country"])
     logger.debug(f"Raw country counts: {country_value_counts}")
 
     world_map_data = []
@@ -150,44 +154,45 @@ def generate_world_map_charts_data(
     countries: str = None,
     mutations: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     logger.info(f"Starting world map generation for {disease_abbrev} - {gene}")
-    all_data = pd.DataFrame()
+    selected = []
     total_patients = 0
     missing_count = 0
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
+    if frames is None:
+        frames = get_cohort_frames(directory, gene, disease_abbrev, mutations=mutations)
+    for filename, df in frames:
+        try:
+            logger.debug(f"Processing file: {filename}")
+            df = process_dataframe(
+                df,
+                disease_abbrev,
+                gene,
+                user_filters(filter_criteria, aao, countries, mutations),
+            )
+
+            # Count missing countries
+            total_patients += len(df)
+            missing_mask = (
+                df["country"].isna()
+                | (df["country"] == -99)
+                | (df["country"] == "-99")
+            )
+            missing_count += missing_mask.sum()
+
+            selected.append(df)
+
+        except Exception as e:
+            logger.error(f"Error reading file {filename}: {str(e)}", exc_info=True)
             continue
 
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                logger.debug(f"Processing file: {filename}")
-                df = get_cached_dataframe(file_path)
-                df = process_dataframe(df, disease_abbrev, gene)
-
-                if (
-                    filter_criteria is not None
-                    or countries is not None
-                    or mutations is not None
-                ):
-                    df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-                # Count missing countries
-                total_patients += len(df)
-                missing_mask = (
-                    df["country"].isna()
-                    | (df["country"] == -99)
-                    | (df["country"] == "-99")
-                )
-                missing_count += missing_mask.sum()
-
-                all_data = pd.concat([all_data, df])
-
-            except Exception as e:
-                logger.error(f"Error reading file {filename}: {str(e)}", exc_info=True)
-                continue
+    # One concat at the end instead of re-copying the growing frame per workbook
+    all_data = pd.concat(selected) if selected else pd.DataFrame()
+    if all_data.empty:
+        logger.warning("No world map data generated")
+        return None
 
     world_map_data = generate_world_map_data(all_data)
     logger.debug(f"Generated world map data: {len(world_map_data)} points")
@@ -254,7 +259,7 @@ def generate_world_map_charts_data(
         "mutations": {},
     }
     # Generate mutation pie charts for each country and sort by patient count
-    country_patient_counts = all_data["country"].value_counts()
+    country_patient_counts = count_values(all_data["country"])
     sorted_countries = [
         country
         for country in country_patient_counts.index
@@ -264,10 +269,10 @@ def generate_world_map_charts_data(
         and country in COUNTRIES
     ]
 
+    mutation_data_by_country = generate_mutation_data_by_country(all_data)
     for country_code in sorted_countries:
         country_name = COUNTRIES.get(country_code, country_code)
-        country_data = all_data[all_data["country"] == country_code]
-        mutation_data = generate_mutation_data(country_data)
+        mutation_data = mutation_data_by_country.get(country_code, [])
 
         # Only create a chart if there are mutations after filtering out -99
         if mutation_data:
@@ -280,7 +285,7 @@ def generate_world_map_charts_data(
                 "chart": {"type": "pie"},
                 "accessibility": {"enabled": False},
                 "title": {
-                    "text": f"Mutations in {country_name} (n = {len(country_data)})"
+                    "text": f"Mutations in {country_name} (n = {country_patient_counts[country_code]})"
                 },
                 "series": [{"name": "Mutations", "data": mutation_data}],
                 "tooltip": {"pointFormat": "Mutations: <b>{point.y:.1f}%</b>"},
@@ -0,0 +1,364 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+from utils import (
+    MUTATION_SEARCH_COLUMNS,
+    PATHOGENICITY_SEARCH_COLUMNS,
+    get_cached_dataframe,
+    mutation_search_keys,
+    parse_mutation_filter,
+)
+
+logger = logging.getLogger(__name__)
+
+# file_path -> key columns of the rows with mdsgene_decision == "IN", see _build_file_index
+_manifest = {}
+
+# directory -> master patient table of all its workbooks, see _build_master_table
+_master_tables = {}
+
+_INDEX_COLUMNS = ["disease_abbrev", "gene1", "gene2", "gene3"]
+_MUTATION_COLUMNS = [f"mut{i}_{level}" for i in range(1, 4) for level in ("p", "c", "g")]
+
+# Columns the `mutations` filter of apply_filter searches, with the stand-in for missing values
+_SEARCH_COLUMNS = [(col, "") for col in PATHOGENICITY_SEARCH_COLUMNS] + [
+    (col, None) for col in MUTATION_SEARCH_COLUMNS
+]
+
+
+def _search_key_column(col):
+    return f"{col}_search_key"
+
+
+def list_workbooks(directory):
+    """Workbook file names in os.listdir order, skipping Excel lock files."""
+    return [
+        filename
+        for filename in os.listdir(directory)
+        if not (filename.startswith(".~") or filename.startswith("~$"))
+        and (filename.endswith(".xlsx") or filename.endswith(".xls"))
+    ]
+
+
+def _group_positions(keys, positions):
+    """Map every distinct key to the sorted, unique row positions that carry it."""
+    if len(keys) == 0:
+        return {}
+    groups = pd.Series(positions).groupby(pd.Series(keys, dtype=object), sort=False).indices
+    return {key: np.unique(positions[locations]) for key, locations in groups.items()}
+
+
+def _build_file_index(df, file_mod_time):
+    entry = {"mod_time": file_mod_time, "indexed": False, "patients": None}
+
+    if any(col not in df.columns for col in _INDEX_COLUMNS):
+        # Callers get the whole sheet and keep their own (failing or permissive) filters
+        return entry
+
+    if "mdsgene_decision" in df.columns:
+        positions = np.flatnonzero((df["mdsgene_decision"] == "IN").to_numpy())
+    else:
+        positions = np.arange(len(df))
+
+    disease = df["disease_abbrev"].to_numpy(dtype=object)[positions]
+    if not all(isinstance(value, str) for value in disease):
+        # Callers call .str methods on this column; let them see the same values
+        return entry
+
+    patients = {"row": positions}
+    for col in _INDEX_COLUMNS + ["pmid"] + _MUTATION_COLUMNS:
+        if col in df.columns:
+            patients[col] = df[col].to_numpy(dtype=object)[positions]
+        else:
+            patients[col] = np.full(len(positions), None, dtype=object)
+    for col, na_value in _SEARCH_COLUMNS:
+        if col in df.columns:
+            patients[_search_key_column(col)] = mutation_search_keys(df[col], na_value)[positions]
+        else:
+            patients[_search_key_column(col)] = np.full(len(positions), None, dtype=object)
+
+    entry["patients"] = pd.DataFrame(patients)
+    entry["indexed"] = True
+    return entry
+
+
+def get_file_index(file_path):
+    """Return the manifest entry of one workbook, re-indexing it if the file changed."""
+    entry = _manifest.get(file_path)
+    if entry is not None and (
+        not dataset_cache.mtime_check_enabled()
+        or entry["mod_time"] == os.path.getmtime(file_path)
+    ):
+        return entry
+
+    return refresh_file_index(file_path)
+
+
+def refresh_file_index(file_path):
+    """Re-index a workbook from its cached frame and swap the new entry in."""
+    file_mod_time = os.path.getmtime(file_path)
+    entry = _build_file_index(get_cached_dataframe(file_path), file_mod_time)
+    # The master table of the directory notices the new entry and rebuilds itself
+    _manifest[file_path] = entry
+    logger.debug(f"Indexed {file_path}: {len(entry['patients']) if entry['indexed'] else 'not'} indexed rows")
+    return entry
+
+
+def forget_file_index(file_path):
+    _manifest.pop(file_path, None)
+
+
+def _build_master_table(directory, filenames, entries):
+    """
+    Stack the key columns of every workbook of a directory into one patient table
+    with a source_file column, and index it by gene and disease, by PMID, by
+    mutation identifier (mutN_p/c/g) and by the lower-cased search keys of the
+    `mutations` filter (pathogenicityN and mutN_p/c/g). Positions in the indexes are rows of the
+    master table; its "row" column points back into the workbook's own frame.
+    """
+    indexed = [filename for filename in filenames if entries[filename]["indexed"]]
+    frames = [entries[filename]["patients"] for filename in indexed]
+    if frames:
+        patients = pd.concat(frames, ignore_index=True)
+    else:
+        patients = pd.DataFrame(
+            columns=["row"]
+            + _INDEX_COLUMNS
+            + ["pmid"]
+            + _MUTATION_COLUMNS
+            + [_search_key_column(col) for col, _ in _SEARCH_COLUMNS]
+        )
+    patients["source_file"] = pd.Categorical(
+        np.repeat(indexed, [len(frame) for frame in frames]), categories=indexed
+    )
+
+    master = {
+        "entries": [entries[filename] for filename in filenames],
+        "files": filenames,
+        "unindexed": {filename for filename in filenames if not entries[filename]["indexed"]},
+        "patients": patients,
+        "genes": {},
+        "pmids": {},
+        "mutations": {},
+        "mutation_search": {},
+    }
+
+    positions = np.arange(len(patients))
+    disease = patients["disease_abbrev"].to_numpy(dtype=object)
+    genes = []
+    diseases = []
+    gene_positions = []
+    for i in range(1, 4):
+        gene = patients[f"gene{i}"].to_numpy(dtype=object)
+        present = pd.notna(gene)
+        genes.append(gene[present])
+        diseases.append(disease[present])
+        gene_positions.append(positions[present])
+
+    genes = np.concatenate(genes)
+    diseases = np.concatenate(diseases)
+    gene_positions = np.concatenate(gene_positions)
+    for gene, locations in _group_positions(genes, np.arange(len(genes))).items():
+        master["genes"][gene] = _group_positions(diseases[locations], gene_positions[locations])
+
+    pmid = patients["pmid"].to_numpy(dtype=object)
+    present = pd.notna(pmid)
+    master["pmids"] = _group_positions(pmid[present], positions[present])
+
+    identifiers = []
+    identifier_positions = []
+    for col in _MUTATION_COLUMNS:
+        values = patients[col].to_numpy(dtype=object)
+        # Only text identifiers; the callers compare them with strings
+        present = np.array([isinstance(value, str) for value in values], dtype=bool)
+        identifiers.append(values[present])
+        identifier_positions.append(positions[present])
+    master["mutations"] = _group_positions(
+        np.concatenate(identifiers), np.concatenate(identifier_positions)
+    )
+
+    search_keys = []
+    search_positions = []
+    for col, _ in _SEARCH_COLUMNS:
+        values = patients[_search_key_column(col)].to_numpy(dtype=object)
+        # None marks a column the workbook does not have
+        present = pd.notna(values)
+        search_keys.append(values[present])
+        search_positions.append(positions[present])
+    master["mutation_search"] = _group_positions(
+        np.concatenate(search_keys), np.concatenate(search_positions)
+    )
+
+    logger.debug(
+        f"Built master table of {directory}: {len(patients)} patients from {len(indexed)} workbooks"
+    )
+    return master
+
+
+def get_master_table(directory):
+    """Return the master patient table of a directory, rebuilding it if any workbook changed."""
+    filenames = list_workbooks(directory)
+    entries = {}
+    for filename in filenames:
+        try:
+            entries[filename] = get_file_index(os.path.join(directory, filename))
+        except Exception as e:
+            logger.error(f"Error loading file {filename}: {str(e)}")
+    filenames = [filename for filename in filenames if filename in entries]
+
+    master = _master_tables.get(directory)
+    if (
+        master is None
+        or master["files"] != filenames
+        # refresh_file_index swaps in a new entry object when a workbook changes
+        or any(old is not entries[filename] for filename, old in zip(filenames, master["entries"]))
+    ):
+        master = _build_master_table(directory, filenames, entries)
+        _master_tables[directory] = master
+    return master
+
+
+def _disease_matcher(disease_abbrev, disease_match):
+    if disease_match is not None:
+        return disease_match
+    if disease_abbrev is not None:
+        disease_abbrev = disease_abbrev.upper()
+        return lambda value: value.upper() == disease_abbrev
+    return lambda value: True
+
+
+def _cohort_positions(master, gene, matches, pmid, mutation, mutations):
+    by_disease = master["genes"].get(gene, {})
+    chunks = [rows for disease, rows in by_disease.items() if matches(disease)]
+    if not chunks:
+        return np.empty(0, dtype=np.int64)
+
+    positions = np.unique(np.concatenate(chunks))
+    if pmid is not None:
+        positions = np.intersect1d(positions, master["pmids"].get(pmid, positions[:0]))
+    if mutation is not None:
+        positions = np.intersect1d(positions, master["mutations"].get(mutation, positions[:0]))
+    if mutations:
+        hits = [master["mutation_search"].get(key, positions[:0]) for key in parse_mutation_filter(mutations)]
+        positions = np.intersect1d(positions, np.concatenate(hits))
+    return positions
+
+
+def get_cohort_rows(
+    directory, gene, disease_abbrev=None, disease_match=None, pmid=None, mutation=None, mutations=None
+):
+    """
+    One indexed slice of the master table: the patients of a cohort, optionally
+    narrowed to one PMID, to patients carrying one mutation identifier and to
+    the patients the `mutations` filter string of apply_filter would keep.
+    Returns the master rows (source_file, row and the key columns) in file order.
+    """
+    master = get_master_table(directory)
+    matches = _disease_matcher(disease_abbrev, disease_match)
+    return master["patients"].iloc[_cohort_positions(master, gene, matches, pmid, mutation, mutations)]
+
+
+def get_cohort_frames(
+    directory, gene, disease_abbrev=None, disease_match=None, pmid=None, mutation=None, mutations=None
+):
+    """
+    Yield (filename, df) for every workbook that has "IN" rows of the cohort.
+
+    df holds only the rows whose gene1/gene2/gene3 equals `gene` and whose
+    disease_abbrev equals `disease_abbrev` case-insensitively (or satisfies
+    `disease_match`), optionally narrowed to one PMID, one mutation identifier
+    or the `mutations` filter string, in their original order. It is a superset of what the callers' own filters
+    keep, so they can apply those filters unchanged. Workbooks that cannot be
+    indexed are yielded whole.
+    """
+    master = get_master_table(directory)
+    cohort = get_cohort_rows(directory, gene, disease_abbrev, disease_match, pmid, mutation, mutations)
+    rows_by_file = {
+        filename: group["row"].to_numpy()
+        for filename, group in cohort.groupby("source_file", observed=True, sort=False)
+    }
+
+    for filename in master["files"]:
+        if filename not in master["unindexed"] and filename not in rows_by_file:
+            continue
+
+        file_path = os.path.join(directory, filename)
+        try:
+            df = get_cached_dataframe(file_path)
+            if filename in rows_by_file:
+                df = df.iloc[rows_by_file[filename]]
+        except Exception as e:
+            logger.error(f"Error loading file {filename}: {str(e)}")
+            continue
+
+        yield filename, df
+
+
+def get_gene_frames(directory, genes):
+    """
+    Yield (filename, df, carriers) for every workbook that has "IN" rows carrying
+    any of `genes`, in any gene slot and with any disease.
+
+    df is the whole cached frame of the workbook; carriers is a frame of one
+    (row, gene) entry per patient and requested gene they carry, row being
+    the label in df's index, so the callers select the rows once and tally all
+    genes in one grouped pass. Workbooks that cannot be indexed come with every
+    row carrying the genes whose name is part of the file name.
+    """
+
+    master = get_master_table(directory)
+    patients = master["patients"]
+    genes = list(dict.fromkeys(genes))
+
+    chunks = [
+        _cohort_positions(master, gene, lambda value: True, None, None, None) for gene in genes
+    ]
+    positions = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+    carried = pd.DataFrame(
+        {
+            "source_file": patients["source_file"].to_numpy()[positions],
+            "row": patients["row"].to_numpy()[positions],
+            "gene": np.repeat(np.array(genes, dtype=object), [len(chunk) for chunk in chunks]),
+        }
+    )
+    carriers_by_file = {
+        filename: group[["row", "gene"]]
+        for filename, group in carried.groupby("source_file", observed=True, sort=False)
+    }
+
+    for filename in master["files"]:
+        if filename in master["unindexed"]:
+            file_genes = [gene for gene in genes if gene.upper() in filename.upper()]
+            if not file_genes:
+                continue
+        elif filename not in carriers_by_file:
+            continue
+
+        file_path = os.path.join(directory, filename)
+        try:
+            df = get_cached_dataframe(file_path)
+        except Exception as e:
+            logger.error(f"Error loading file {filename}: {str(e)}")
+            continue
+
+        if filename in master["unindexed"]:
+            carriers = pd.DataFrame(
+                {
+                    "row": np.tile(df.index.to_numpy(), len(file_genes)),
+                    "gene": np.repeat(np.array(file_genes, dtype=object), len(df)),
+                }
+            )
+        else:
+            carriers = carriers_by_file[filename]
+            carriers = pd.DataFrame(
+                {
+                    "row": df.index.to_numpy()[carriers["row"].to_numpy(dtype=np.int64)],
+                    "gene": carriers["gene"].to_numpy(),
+                }
+            )
+
+        yield filename, df, carriers
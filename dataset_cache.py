@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for all cached DataFrames of one worker process, in bytes
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+RAW_VARIANT = "raw"
+
+
+def dataframe_size(df):
+    """Deep memory footprint of a DataFrame, including the Python strings in object columns."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class DatasetCache:
+    """
+    LRU cache of DataFrames derived from workbooks, bounded by a byte budget.
+
+    Entries are keyed by (file_path, variant) so callers that need different
+    views of the same workbook (raw sheet, normalized frame, ...) share one
+    budget and one eviction order. An entry is dropped as soon as the
+    workbook's modification time changes.
+    """
+
+    def __init__(self, max_bytes=DATASET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        # Turned off while a watcher reports changes, see dataset_watcher
+        self.check_mtime = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_path, variant, loader):
+        key = (file_path, variant)
+        file_mod_time = os.path.getmtime(file_path) if self.check_mtime else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.check_mtime or entry["mod_time"] == file_mod_time):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["dataframe"]
+            self.misses += 1
+
+        return self.reload(file_path, variant, loader)
+
+    def reload(self, file_path, variant, loader):
+        """Build a variant unconditionally and swap it in; readers keep the old frame until then."""
+        # Taken before loading, so a write that lands during the load is seen as a new change
+        file_mod_time = os.path.getmtime(file_path)
+        # Load outside the lock so one slow workbook does not block the others
+        df = loader(file_path)
+        self.put(file_path, variant, df, file_mod_time)
+        return df
+
+    def put(self, file_path, variant, df, file_mod_time):
+        key = (file_path, variant)
+        size = dataframe_size(df)
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {"dataframe": df, "mod_time": file_mod_time, "size": size}
+            self.current_bytes += size
+            self._evict(keep=key)
+
+    def invalidate(self, file_path=None, variant=None):
+        """Drop cached variants of one workbook, or the whole cache if no path is given."""
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (file_path is None or key[0] == file_path)
+                and (variant is None or key[1] == variant)
+            ]
+            for key in keys:
+                self._remove(key)
+
+    def cached_variants(self, file_path):
+        with self._lock:
+            return [variant for path, variant in self._entries if path == file_path]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry["size"]
+
+    def _evict(self, keep):
+        # The entry just stored stays even if it alone exceeds the budget
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            self._remove(key)
+            self.evictions += 1
+            logger.debug(f"Evicted {key[0]} ({key[1]}, {entry['size']} bytes) from dataset cache")
+
+
+_dataset_cache = DatasetCache()
+
+
+def get_dataset(file_path, variant, loader):
+    """Return the cached `variant` of a workbook, building it with loader(file_path) on a miss."""
+    return _dataset_cache.get(file_path, variant, loader)
+
+
+def read_workbook(file_path):
+    _, file_extension = os.path.splitext(file_path)
+    engine = "openpyxl" if file_extension.lower() == ".xlsx" else "xlrd"
+    return pd.read_excel(file_path, engine=engine)
+
+
+def get_raw_workbook(file_path):
+    """
+    The sheet exactly as pd.read_excel returns it, parsed at most once per change.
+
+    Callers derive their own variants from it and must not modify it in place;
+    take a copy first.
+    """
+    return get_dataset(file_path, RAW_VARIANT, read_workbook)
+
+
+def put_dataset(file_path, variant, df, file_mod_time):
+    """Store a frame built elsewhere, e.g. in a warm-up worker process."""
+    _dataset_cache.put(file_path, variant, df, file_mod_time)
+
+
+def reload_dataset(file_path, variant, loader):
+    return _dataset_cache.reload(file_path, variant, loader)
+
+
+def invalidate(file_path=None, variant=None):
+    _dataset_cache.invalidate(file_path, variant)
+
+
+def cached_variants(file_path):
+    return _dataset_cache.cached_variants(file_path)
+
+
+def set_mtime_check(enabled):
+    """
+    Enable or disable the per-request modification-time check.
+
+    With a watcher running, changes are pushed to the cache instead, so
+    requests are served from memory without touching the filesystem.
+    """
+    _dataset_cache.check_mtime = enabled
+
+
+def mtime_check_enabled():
+    return _dataset_cache.check_mtime
+
+
+def get_cache_stats():
+    return _dataset_cache.stats()
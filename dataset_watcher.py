@@ -0,0 +1,194 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+import cohort_manifest
+import dataset_cache
+import utils
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # Without watchdog the directories are polled instead
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans when inotify is not available
+WATCH_POLL_INTERVAL = float(os.getenv("DATASET_WATCH_POLL_INTERVAL", 2.0))
+
+# Quiet period after the last event before a file is rebuilt; uploads land in several writes
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("DATASET_WATCH_DEBOUNCE", 1.0))
+
+# Callbacks called with the changed path after its datasets have been swapped in
+_change_listeners = []
+
+
+def add_change_listener(callback):
+    _change_listeners.append(callback)
+
+
+def default_watch_paths():
+    return sorted(path for path in glob.glob("excel*") if os.path.isdir(path)) + ["properties"]
+
+
+def is_workbook(path):
+    filename = os.path.basename(path)
+    return (
+        not (filename.startswith(".~") or filename.startswith("~$"))
+        and (filename.endswith(".xlsx") or filename.endswith(".xls"))
+    )
+
+
+def drop_workbook(file_path):
+    """Forget the cached datasets and index of one workbook; the next request builds them again."""
+    dataset_cache.invalidate(file_path)
+    cohort_manifest.forget_file_index(file_path)
+
+
+def refresh_workbook(file_path):
+    """
+    Rebuild the cached views of one workbook and swap them in. This parses and
+    normalizes the whole sheet, so it runs in the watcher thread or, from a
+    request, in the thread pool.
+    """
+    if not os.path.exists(file_path):
+        drop_workbook(file_path)
+        logger.info(f"Dropped datasets of removed workbook {file_path}")
+        return
+
+    started = time.perf_counter()
+    variants = set(dataset_cache.cached_variants(file_path))
+
+    # The raw sheet goes first: the other variants are derived from it
+    if dataset_cache.RAW_VARIANT in variants:
+        dataset_cache.reload_dataset(file_path, dataset_cache.RAW_VARIANT, dataset_cache.read_workbook)
+    utils.reload_cached_dataframe(file_path)
+    for variant in variants - {dataset_cache.RAW_VARIANT, utils.NORMALIZED_VARIANT}:
+        # Cheap to derive again from the fresh raw sheet on the next request
+        dataset_cache.invalidate(file_path, variant)
+
+    cohort_manifest.refresh_file_index(file_path)
+    logger.info(f"Refreshed {file_path} in {time.perf_counter() - started:.3f}s")
+
+
+def _notify(path):
+    for callback in _change_listeners:
+        try:
+            callback(path)
+        except Exception as e:
+            logger.error(f"Change listener failed for {path}: {str(e)}")
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.schedule(os.path.relpath(path))
+
+
+class DatasetWatcher:
+    """
+    Watches the workbook directories and properties/ and refreshes caches in a
+    background thread. Uses inotify through watchdog when available and falls
+    back to polling modification times.
+    """
+
+    def __init__(self, paths=None):
+        self.paths = [path for path in (paths or default_watch_paths()) if os.path.isdir(path)]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def schedule(self, path):
+        with self._lock:
+            self._pending[path] = time.monotonic()
+
+    def start(self):
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                handler = _EventHandler(self)
+                for path in self.paths:
+                    self._observer.schedule(handler, path, recursive=False)
+                self._observer.start()
+                logger.info(f"Watching {self.paths} with {type(self._observer).__name__}")
+            except OSError as e:
+                # e.g. the inotify watch limit is exhausted
+                logger.warning(f"inotify unavailable ({str(e)}), polling {self.paths} instead")
+                self._observer = None
+
+        if self._observer is None:
+            self._start_thread(self._poll, "dataset-watcher-poll")
+        self._start_thread(self._process, "dataset-watcher")
+
+        # Changes are pushed from here on, so requests can skip the filesystem check
+        dataset_cache.set_mtime_check(False)
+        return self
+
+    def stop(self):
+        dataset_cache.set_mtime_check(True)
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _scan(self):
+        mtimes = {}
+        for directory in self.paths:
+            for filename in os.listdir(directory):
+                path = os.path.join(directory, filename)
+                try:
+                    mtimes[path] = os.path.getmtime(path)
+                except OSError:
+                    continue
+        return mtimes
+
+    def _poll(self):
+        known = self._scan()
+        while not self._stop.wait(WATCH_POLL_INTERVAL):
+            current = self._scan()
+            for path in set(known) | set(current):
+                if known.get(path) != current.get(path):
+                    self.schedule(path)
+            known = current
+
+    def _take_settled(self):
+        now = time.monotonic()
+        with self._lock:
+            settled = [path for path, seen in self._pending.items() if now - seen >= WATCH_DEBOUNCE_SECONDS]
+            for path in settled:
+                del self._pending[path]
+        return settled
+
+    def _process(self):
+        while not self._stop.wait(0.25):
+            for path in self._take_settled():
+                try:
+                    if is_workbook(path):
+                        refresh_workbook(path)
+                    _notify(path)
+                except Exception as e:
+                    logger.error(f"Error refreshing {path}: {str(e)}")
+
+
+def start_watcher(paths=None):
+    return DatasetWatcher(paths).start()
@@ -1,30 +1,13 @@
 import os
 import pandas as pd
 
-# Dictionary to store cached data and their modification time
-_dataframe_cache = {}
+import dataset_cache
 
 
 def get_cached_dataframe(file_path):
-    global _dataframe_cache
-
-    # Get the last modification time of the file
-    file_mod_time = os.path.getmtime(file_path)
-
-    # Check if the file is in the cache and if it is up to date
-    if file_path in _dataframe_cache and _dataframe_cache[file_path]['mod_time'] == file_mod_time:
-        return _dataframe_cache[file_path]['dataframe']
-
-    # If the file is not cached or it has been modified, read it again
-    df = pd.read_excel(file_path)
-
-    # Cache the dataframe with its modification time
-    _dataframe_cache[file_path] = {
-        'dataframe': df,
-        'mod_time': file_mod_time
-    }
-
-    return df
+    # Raw sheet from the shared dataset cache; gene slots are not blanked here,
+    # so co-occurring genes stay visible in the disease/gene listing
+    return dataset_cache.get_raw_workbook(file_path)
 
 
 def get_unique_disease_abbrev(directory='excel'):
@@ -0,0 +1,53 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Duration unit buckets from short to long -> synonyms/abbreviations that also put a text in them
+DURATION_UNITS = {
+    "seconds": ["sec", r"\b\d+\s*s\b"],
+    "minutes": ["min", r"\b\d+\s*m\b"],
+    "hours": ["hr", r"\b\d+\s*h\b"],
+    "days": ["day", "days"],
+    "weeks": ["week", "weeks"],
+    "months": ["month", "months"],
+    "years": ["year", "years"],
+}
+
+# One compiled pattern per unit: its own name as a word or any of its synonyms; the first unit that matches wins
+_UNIT_PATTERNS = [
+    (unit, re.compile("|".join([rf"\b{re.escape(unit)}\b"] + synonyms)))
+    for unit, synonyms in DURATION_UNITS.items()
+]
+_UNIT_CODES = {unit: code for code, unit in enumerate(DURATION_UNITS)}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Distinct duration texts remembered by parse_duration; the result only depends on the text
+PARSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_duration(text):
+    """
+    (unit, value) of a free-text duration such as "2-3 hours": the unit bucket
+    of DURATION_UNITS and the first number in the text (the lower bound of a
+    range). Either is None if the text has none. Memoized per text, up to
+    PARSE_CACHE_SIZE texts.
+    """
+    txt = text.lower()
+    unit = next((unit for unit, pattern in _UNIT_PATTERNS if pattern.search(txt)), None)
+    number = _NUMBER.search(txt)
+    return unit, float(number.group()) if number else None
+
+
+def count_duration_units(texts):
+    """Number of texts per unit bucket, in DURATION_UNITS order; texts without a unit are not counted."""
+    labels, distinct = pd.factorize(pd.Series(list(texts), dtype=object))
+    # Every distinct text is classified once; the last code stands for the factorize NaN label -1
+    unit_codes = np.array(
+        [_UNIT_CODES.get(parse_duration(text)[0], -1) for text in distinct] + [-1], dtype=np.int64
+    )
+    codes = unit_codes[labels]
+    return np.bincount(codes[codes >= 0], minlength=len(DURATION_UNITS)).tolist()
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from genotypes import COMP_HET_FLAG, HET_ONLY_FLAG, HOM_OR_COMP_HET_FLAG, genotype_flag
+
+# apply_filter criteria without a parameter; each gets a precomputed boolean column
+FIXED_CRITERIA = [1, 4, 5, 6, 7, 8, 9]
+
+_COMP_HET_COMMENT = "compound heterozygous mutation"
+_HOM_OR_COMP_HET_COMMENT = "compound heterozygous mutation|homozygous mutation"
+
+
+def bitmap_column(filter_criteria):
+    return f"criterion_{filter_criteria}"
+
+
+def _comments_mask(df, pattern):
+    comments_pat_column = next(
+        (col for col in df.columns if col.lower() == "comments_pat"), None
+    )
+    if comments_pat_column is None:
+        return pd.Series(False, index=df.index)
+    return df[comments_pat_column].astype(str).str.contains(pattern, case=False, na=False)
+
+
+def compute_criterion(df, filter_criteria):
+    """Row mask of one of the FIXED_CRITERIA, evaluated from the data columns."""
+    if filter_criteria == 1:
+        return df["index_pat"] == "yes"
+    if filter_criteria == 4:
+        return df["sex"] == "female"
+    if filter_criteria == 5:
+        return df["sex"] == "male"
+    if filter_criteria == 6:
+        return (
+            (df["mut1_genotype"] == "hom")
+            | (df["mut2_genotype"] == "hom")
+            | (df["mut3_genotype"] == "hom")
+        )
+    if filter_criteria == 7:
+        # Heterozygous mutations, without the compound hets
+        return genotype_flag(df, HET_ONLY_FLAG)
+    if filter_criteria == 8:
+        # Compound hets noted in the comments or detected from the genotypes
+        return _comments_mask(df, _COMP_HET_COMMENT) | genotype_flag(df, COMP_HET_FLAG)
+    if filter_criteria == 9:
+        return _comments_mask(df, _HOM_OR_COMP_HET_COMMENT) | genotype_flag(
+            df, HOM_OR_COMP_HET_FLAG
+        )
+    raise ValueError(f"Criterion {filter_criteria} takes a parameter and has no bitmap")
+
+
+def criterion_mask(df, filter_criteria):
+    """The precomputed bitmap of a criterion, or the mask computed on the fly if the frame has none."""
+    column = bitmap_column(filter_criteria)
+    if column in df.columns:
+        return df[column]
+    return compute_criterion(df, filter_criteria)
+
+
+def add_filter_bitmaps(df):
+    """
+    Append one boolean column per fixed criterion to a normalized frame, so
+    apply_filter only combines bitmaps at request time. A criterion whose
+    columns are missing from the sheet gets no bitmap and keeps failing at
+    request time as it always did.
+    """
+    bitmaps = {}
+    for filter_criteria in FIXED_CRITERIA:
+        try:
+            bitmaps[bitmap_column(filter_criteria)] = (
+                compute_criterion(df, filter_criteria).to_numpy(dtype=bool)
+            )
+        except (KeyError, TypeError):
+            continue
+
+    if not bitmaps:
+        return df
+    return pd.concat([df, pd.DataFrame(bitmaps, index=df.index)], axis=1)
@@ -0,0 +1,126 @@
+import logging
+import time
+
+import overview
+from charts.aao_empirical_distribution import generate_aao_empirical_distribution
+from charts.aao_histogram import generate_aao_histogram
+from charts.country_pie import generate_country_pie_chart
+from charts.ethnicity_pie import generate_ethnicity_pie_chart
+from charts.initial_signs_symptoms import generate_initial_signs_symptoms
+from charts.levodopa_response import generate_levodopa_response
+from charts.reporter_signs_symptoms import generate_symptoms_chart
+from charts.world_map import generate_world_map_charts_data
+from cohort_manifest import get_cohort_frames
+from utils import filter_mask, handle_nan_inf
+
+logger = logging.getLogger(__name__)
+
+
+def _unique_studies(disease_abbrev, gene, directory, frames):
+    # Same post-processing as the /unique_studies endpoint
+    return handle_nan_inf(
+        overview.get_unique_studies(disease_abbrev, gene, directory=directory, frames=frames)
+    )
+
+
+# Chart name (the path of its own endpoint) -> builder; the order is the order of the page
+DASHBOARD_CHARTS = {
+    "aao_histogram": generate_aao_histogram,
+    "aao_empirical_distribution": generate_aao_empirical_distribution,
+    "country_pie_chart": generate_country_pie_chart,
+    "ethnicity_pie_chart": generate_ethnicity_pie_chart,
+    "initial_signs_symptoms": generate_initial_signs_symptoms,
+    "levodopa_response": generate_levodopa_response,
+    "reporter_signs_symptoms": generate_symptoms_chart,
+    "world_map": generate_world_map_charts_data,
+    "unique_studies": _unique_studies,
+}
+
+
+def load_dashboard_frames(
+    disease_abbrev: str,
+    gene: str,
+    filter_criteria: int = None,
+    aao: float = None,
+    countries: str = None,
+    mutations: str = None,
+    directory: str = "excel",
+):
+    """
+    The cohort of the gene page as [(filename, df)], loaded once for all charts.
+
+    The rows are the gene's patients whose disease matches as get_unique_studies
+    matches it, a superset of the charts' exact disease comparison, which they
+    still apply themselves. The user filters are applied here, so the charts
+    are built without them; a workbook the filters fail on is left out, as
+    every chart would skip it.
+    """
+    filtered = filter_criteria is not None or countries is not None or mutations is not None
+    frames = []
+    for filename, df in get_cohort_frames(
+        directory, gene, disease_match=overview.disease_matcher(disease_abbrev), mutations=mutations
+    ):
+        if filtered:
+            try:
+                mask = filter_mask(df, filter_criteria, aao, countries, mutations)
+            except Exception as e:
+                logger.error(f"Error filtering file {filename}: {str(e)}")
+                continue
+            if mask is not None:
+                df = df[mask]
+        frames.append((filename, df))
+    return frames
+
+
+def iter_gene_dashboard(
+    disease_abbrev: str,
+    gene: str,
+    filter_criteria: int = None,
+    aao: float = None,
+    countries: str = None,
+    mutations: str = None,
+    directory: str = "excel",
+):
+    """Yield {"chart": name, "data": ...} (or "error") for every chart as soon as it is built."""
+    started = time.perf_counter()
+    frames = load_dashboard_frames(
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+    )
+    logger.info(
+        f"Loaded dashboard cohort of {disease_abbrev} - {gene} from {len(frames)} workbooks "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+    for name, build in DASHBOARD_CHARTS.items():
+        try:
+            data = build(disease_abbrev, gene, directory=directory, frames=frames)
+        except Exception as e:
+            # One broken chart does not take the rest of the page down
+            logger.error(f"Dashboard chart {name} failed: {str(e)}", exc_info=True)
+            yield {"chart": name, "error": str(e)}
+            continue
+        yield {"chart": name, "data": data}
+
+
+def get_gene_dashboard(
+    disease_abbrev: str,
+    gene: str,
+    filter_criteria: int = None,
+    aao: float = None,
+    countries: str = None,
+    mutations: str = None,
+    directory: str = "excel",
+):
+    """All charts of the gene page as {name: data}, with failed charts under "errors"."""
+    dashboard = {}
+    errors = {}
+    for entry in iter_gene_dashboard(
+        disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
+    ):
+        if "error" in entry:
+            errors[entry["chart"]] = entry["error"]
+        else:
+            dashboard[entry["chart"]] = entry["data"]
+    if errors:
+        dashboard["errors"] = errors
+    return dashboard
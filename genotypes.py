@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Boolean columns added to every normalized frame, see add_genotype_flags
+COMP_HET_FLAG = "is_comp_het"
+HET_ONLY_FLAG = "is_het_only"
+HOM_OR_COMP_HET_FLAG = "is_hom_or_comp_het"
+GENOTYPE_FLAGS = [COMP_HET_FLAG, HET_ONLY_FLAG, HOM_OR_COMP_HET_FLAG]
+
+
+def _slot_values(df, col):
+    """Column values as objects, with None for missing text (categorical or object) values."""
+    series = df[col]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = np.append(series.cat.categories.to_numpy(dtype=object), None)
+        return labels[series.cat.codes.to_numpy()]
+    return series.to_numpy(dtype=object)
+
+
+def _is_genotype(df, i, genotype):
+    return (df[f"mut{i}_genotype"] == genotype).to_numpy()
+
+
+def compound_het_mask(df):
+    """
+    Vectorized has_compound_het: a patient is compound heterozygous if, among
+    the slots whose gene, mutN_p and genotype are all set (not None / "-99"),
+    an earlier slot is "comp_het" and a later one has the same gene, or two
+    "het" slots of the same gene carry different protein mutations.
+    """
+    genes = []
+    mutations = []
+    genotypes = []
+    valid = []
+    for i in range(1, 4):
+        gene = _slot_values(df, f"gene{i}")
+        mutation = _slot_values(df, f"mut{i}_p")
+        genotype = _slot_values(df, f"mut{i}_genotype")
+        slot_valid = np.ones(len(df), dtype=bool)
+        for values in (gene, mutation, genotype):
+            # Numeric NaN counts as set, as it did for the row-wise check
+            slot_valid &= ~(np.equal(values, None) | np.equal(values, "-99"))
+        genes.append(gene)
+        mutations.append(mutation)
+        genotypes.append(genotype)
+        valid.append(slot_valid)
+
+    mask = np.zeros(len(df), dtype=bool)
+    for i in range(3):
+        for j in range(i + 1, 3):
+            pair = valid[i] & valid[j] & np.equal(genes[i], genes[j])
+            comp_het = np.equal(genotypes[i], "comp_het")
+            het_pair = (
+                np.equal(genotypes[i], "het")
+                & np.equal(genotypes[j], "het")
+                & np.not_equal(mutations[i], mutations[j])
+            )
+            mask |= pair & (comp_het | het_pair)
+
+    return pd.Series(mask, index=df.index)
+
+
+def classify_genotypes(df):
+    """The genotype flags used by apply_filter criteria 7 to 9, as a frame of booleans."""
+    comp_het = compound_het_mask(df).to_numpy()
+    het = np.zeros(len(df), dtype=bool)
+    hom = np.zeros(len(df), dtype=bool)
+    for i in range(1, 4):
+        het |= _is_genotype(df, i, "het")
+        hom |= _is_genotype(df, i, "hom")
+
+    return pd.DataFrame(
+        {
+            COMP_HET_FLAG: comp_het,
+            HET_ONLY_FLAG: het & ~comp_het,
+            HOM_OR_COMP_HET_FLAG: hom | comp_het,
+        },
+        index=df.index,
+    )
+
+
+def add_genotype_flags(df):
+    """Append the genotype flags to a normalized frame; sheets without gene slots get none."""
+    try:
+        flags = classify_genotypes(df)
+    except KeyError:
+        return df
+    return pd.concat([df, flags], axis=1)
+
+
+def genotype_flag(df, flag):
+    """Read a precomputed genotype flag, or compute it for frames that lack the columns."""
+    if flag in df.columns:
+        return df[flag]
+    return classify_genotypes(df)[flag]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+RESPONSE_QUANTIFICATION = {
+    "Good": ["good/excellent", "good/transient", "good", "excellent", "significantly"],
+    "Yes, undefined": ["-99"],
+    "Minimal": ["minimal/intermittent", "minimal", "intermittent", "poor"],
+    "Moderate": ["moderate", "marked"],
+    "Not treated": ["not treated"],
+}
+
+# Categorical column added to every normalized frame, see add_levodopa_category
+LEVODOPA_CATEGORY = "levodopa_category"
+
+# Lower-cased keyword -> category; the first category listing a keyword wins
+_QUANTIFICATION_LOOKUP = {}
+for _category, _keywords in RESPONSE_QUANTIFICATION.items():
+    for _keyword in _keywords:
+        _QUANTIFICATION_LOOKUP.setdefault(_keyword.lower(), _category)
+
+
+def _lower_strings(series):
+    """str(value).lower() of every value, as the row-wise check saw them (missing text is None)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = series.cat.categories.astype(str).str.lower().to_numpy(dtype=object)
+        return np.append(labels, "none")[series.cat.codes.to_numpy()]
+    return series.astype(str).str.lower().to_numpy(dtype=object)
+
+
+def classify_levodopa_response(df):
+    """
+    The levodopa category of every row from levodopa_response and
+    response_quantification, None if there is none.
+    """
+    response = df["levodopa_response"]
+    quantification = df["response_quantification"]
+    response_text = _lower_strings(response)
+    quantification_text = _lower_strings(quantification)
+
+    yes = response_text == "yes"
+    unquantified = (
+        (quantification_text == "-99")
+        | quantification.isna().to_numpy()
+        | (quantification_text == "")
+    )
+    quantified = pd.Series(quantification_text).map(_QUANTIFICATION_LOOKUP).to_numpy(dtype=object)
+
+    category = np.select(
+        [
+            (response_text == "-99") | response.isna().to_numpy(),
+            response_text == "not treated",
+            response_text == "no",
+            yes & unquantified,
+            yes,
+        ],
+        [None, "Not treated", "No", "Yes, unquantified", quantified],
+        default=None,
+    )
+    # map leaves NaN for quantifications without a category
+    category[pd.isna(category)] = None
+    return pd.Series(category, index=df.index, dtype=object)
+
+
+def add_levodopa_category(df):
+    """Append the levodopa category as a categorical column; sheets without the columns get none."""
+    try:
+        category = classify_levodopa_response(df)
+    except KeyError:
+        return df
+    return pd.concat([df, category.astype("category").rename(LEVODOPA_CATEGORY)], axis=1)
+
+
+def levodopa_category(df):
+    """Read the precomputed levodopa category, or classify the rows for frames that lack it."""
+    if LEVODOPA_CATEGORY in df.columns:
+        return df[LEVODOPA_CATEGORY]
+    return classify_levodopa_response(df)
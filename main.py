@@ -1,13 +1,19 @@
+import asyncio
 import json
 import shutil
+from contextlib import asynccontextmanager
 from typing import List, Dict
 
 from fastapi import FastAPI, Query, HTTPException, Form, File, UploadFile, Response
 from pydantic import BaseModel
 
+import chart_views
 import const
+import dataset_watcher
 import diseases
+import gene_dashboard
 import overview
+import warmup
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
@@ -18,7 +24,7 @@ from charts.aao_histogram import generate_aao_histogram
 from charts.country_pie import generate_country_pie_chart
 from charts.ethnicity_pie import generate_ethnicity_pie_chart
 from charts.reporter_signs_symptoms import generate_symptoms_chart
-from charts.initial_signs_symptoms import generate_initial_signs_symptoms
+from charts.initial_signs_symptoms import forget_name_table, generate_initial_signs_symptoms
 from charts.levodopa_response import generate_levodopa_response
 from charts.world_map import generate_world_map_charts_data
 from charts.triggers_chart import generate_triggers_chart
@@ -30,7 +36,7 @@ from mutation_details import get_data_for_mutation
 import logging
 from utils import load_symptom_categories, handle_nan_inf
 import httpx
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from cachetools import TTLCache
 from pubmed_search_endpoint import fetch_pubmed_summaries
 from functools import wraps
@@ -74,7 +80,35 @@ def cache_response(func):
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+def unfiltered_view(chart, directory, disease_abbrev, gene, *filters):
+    """The prebuilt payload of a chart requested without filters, see chart_views, or None."""
+    if any(value is not None for value in filters):
+        return None
+    payload = chart_views.get_view(directory, disease_abbrev, gene, chart)
+    if payload is None:
+        return None
+    return Response(content=payload, media_type="application/json")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+
+    # Responses are cached for a long time; drop them once the data behind them changed
+    dataset_watcher.add_change_listener(lambda path: loop.call_soon_threadsafe(endpoint_cache.clear))
+    dataset_watcher.add_change_listener(chart_views.properties_changed)
+    dataset_watcher.add_change_listener(forget_name_table)
+    watcher = dataset_watcher.start_watcher()
+    # Parse all workbooks in the background; /health reports ready once done
+    warmup.start_warmup()
+    try:
+        yield
+    finally:
+        watcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(qc_routes.router, prefix="/api/gene", tags=["gene"])
 app.include_router(ai_routes.router, prefix="/api/ai", tags=["ai"])
@@ -138,6 +172,11 @@ async def unique_studies_endpoint(
     ),
     mutations: str = Query(None, description="Carrying mutation"),
 ):
+    view = unfiltered_view(
+        "unique_studies", "excel", disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     unique_studies = overview.get_unique_studies(
         disease_abbrev,
         gene,
@@ -193,6 +232,11 @@ async def aao_empirical_distribution_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "aao_empirical_distribution", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_aao_empirical_distribution(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -209,6 +253,11 @@ async def aao_histogram_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "aao_histogram", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_aao_histogram(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -225,6 +274,11 @@ async def country_pie_chart_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "country_pie_chart", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_country_pie_chart(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -241,6 +295,11 @@ async def ethnicity_pie_chart_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "ethnicity_pie_chart", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_ethnicity_pie_chart(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -257,6 +316,11 @@ async def initial_signs_symptoms_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "initial_signs_symptoms", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_initial_signs_symptoms(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -273,6 +337,11 @@ async def levodopa_response_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "levodopa_response", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_levodopa_response(
         disease_abbrev, gene, filter_criteria, countries, aao, mutations, directory
     )
@@ -289,6 +358,11 @@ async def reporter_signs_symptoms_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "reporter_signs_symptoms", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_symptoms_chart(
         disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
     )
@@ -306,12 +380,40 @@ async def generate_world_map_charts_data_endpoint(
     mutations: str = Query(None, description="Comma-separated list of mutations"),
     directory: str = Query("excel", description="Directory"),
 ):
+    view = unfiltered_view(
+        "world_map", directory, disease_abbrev, gene, filter_criteria, aao, countries, mutations
+    )
+    if view is not None:
+        return view
     data = generate_world_map_charts_data(
         disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory
     )
     return data
 
 
+@app.get("/gene_dashboard")
+async def gene_dashboard_endpoint(
+    disease_abbrev: str,
+    gene: str,
+    filter_criteria: int = Query(None, description="Filter criteria"),
+    aao: float = Query(None, description="Age at onset"),
+    countries: str = Query(None, description="Comma-separated list of countries"),
+    mutations: str = Query(None, description="Comma-separated list of mutations"),
+    directory: str = Query("excel", description="Directory"),
+    stream: bool = Query(
+        False, description="Send one NDJSON line per chart as soon as it is built"
+    ),
+):
+    args = (disease_abbrev, gene, filter_criteria, aao, countries, mutations, directory)
+    if stream:
+        lines = (
+            json.dumps(entry, cls=utils.NumpyEncoder) + "\n"
+            for entry in gene_dashboard.iter_gene_dashboard(*args)
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    return gene_dashboard.get_gene_dashboard(*args)
+
+
 @app.get("/triggers_chart")
 async def triggers_chart_endpoint(
     disease_abbrev: str,
@@ -1125,4 +1227,9 @@ Input data:
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "main_app"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "service": "main_app",
+        "ready": warmup.is_ready(),
+        "warmup": warmup.get_warmup_status(),
+    }
\ No newline at end of file
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-import os
 import json
 import math
-from utils import get_cached_dataframe, safe_get
+from utils import expand_categoricals, safe_get
+from cohort_manifest import get_cohort_frames
+from query_plan import carries_gene
 from const import (
     protein_level_identifier_map,
     cdna_level_identifier_map,
@@ -244,36 +245,26 @@ def get_data_for_mutation(disease_abbrev, gene, pmid, mut_p, directory="excel"):
     results = []
     disease_abbrev = disease_abbrev.upper()
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
+    # The mutation index leaves only rows that carry mut_p as a p., c. or g. identifier
+    for filename, df in get_cohort_frames(directory, gene, disease_abbrev, pmid=pmid, mutation=mut_p):
+        try:
+            # Apply all filters using boolean indexing in one step
+            mask = (
+                (df["mdsgene_decision"] == "IN")
+                & (df["disease_abbrev"].str.upper() == disease_abbrev)
+                & carries_gene(df, gene)
+                & (df["pmid"] == pmid)
+            )
+
+            filtered_df = df[mask]
+
+            for _, row in expand_categoricals(filtered_df).iterrows():
+                mutation_data = get_data_for_mutation_from_row(mut_p, row)
+                if mutation_data:
+                    results.extend(mutation_data)
+
+        except Exception as e:
+            print(f"Error reading file {filename}: {str(e)}")
             continue
 
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-
-                # Apply all filters using boolean indexing in one step
-                mask = (
-                    (df["mdsgene_decision"] == "IN")
-                    & (df["disease_abbrev"].str.upper() == disease_abbrev)
-                    & (
-                        (df["gene1"] == gene)
-                        | (df["gene2"] == gene)
-                        | (df["gene3"] == gene)
-                    )
-                    & (df["pmid"] == pmid)
-                )
-
-                filtered_df = df[mask]
-
-                for _, row in filtered_df.iterrows():
-                    mutation_data = get_data_for_mutation_from_row(mut_p, row)
-                    if mutation_data:
-                        results.extend(mutation_data)
-
-            except Exception as e:
-                print(f"Error reading file {filename}: {str(e)}")
-                continue
-
     return results
@@ -0,0 +1,248 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from filter_bitmaps import add_filter_bitmaps
+from genotypes import add_genotype_flags
+from levodopa import add_levodopa_category
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever normalize_dataframe changes its output, so stale snapshots are ignored
+NORMALIZATION_VERSION = 6
+
+# Number of leading rows inspected before a column is validated in full
+SAMPLE_SIZE = 64
+
+# Any value containing one of these characters can never be parsed by pd.to_numeric
+_NON_NUMERIC_PATTERN = r"[^0-9eE+\-.\s]"
+# Spelled-out values that pd.to_numeric may accept despite containing letters
+_SPECIAL_NUMERIC_VALUES = ["inf", "+inf", "-inf", "infinity", "+infinity", "-infinity", "nan"]
+
+# A text column becomes categorical when it has at most this many distinct values per row
+CATEGORY_MAX_RATIO = 0.5
+
+# Schema headers that hold numbers by design; they skip sampling and go straight to validation
+_NUMERIC_HEADER_PREFIXES = (
+    "num_",
+    "aae",
+    "aao",
+    "age_",
+    "duration",
+    "lower_age_limit",
+    "upper_age_limit",
+    "physical_location",
+    "gnomad",
+    "cadd",
+)
+
+
+def _gene_slot_columns(i):
+    return [
+        f'gene{i}', f'physical_location{i}', f'reference_allele{i}',
+        f'observed_allele{i}', f'mut{i}_g', f'mut{i}_c', f'mut{i}_p',
+        f'mut{i}_alias_original', f'mut{i}_alias', f'mut{i}_genotype',
+        f'mut{i}_type', f'pathogenicity{i}', f'CADD_{i}',
+        f'gnomad{i} v2.1.1', f'gnomad{i} v4.0.0'
+    ]
+
+
+def _mask_foreign_gene_slots(df, valid_genes):
+    """Blank out gene slots (gene1..gene3 and their mutation columns) that belong to other genes."""
+    for i in range(1, 4):
+        gene_col = f'gene{i}'
+        if gene_col not in df.columns:
+            continue
+
+        gene_mask = ~df[gene_col].astype(str).fillna('').str.upper().isin(valid_genes)
+        for col in [col for col in _gene_slot_columns(i) if col in df.columns]:
+            if df[col].dtype in ['int64', 'float64']:
+                df.loc[gene_mask, col] = -99
+            else:
+                df.loc[gene_mask, col] = '-99'
+
+
+def _strip_block(block):
+    """astype(str) + strip for a whole block of columns in one vectorized call."""
+    values = block.astype(str).to_numpy(dtype=object)
+    stripped = pd.Series(values.ravel(order="F")).str.strip().to_numpy(dtype=object)
+    return stripped.reshape(values.shape, order="F")
+
+
+def _text_columns(values):
+    """Return a boolean per column: True if some value can never be parsed as a number."""
+    if values.size == 0:
+        return np.zeros(values.shape[1], dtype=bool)
+
+    flat = pd.Series(values.ravel(order="F"))
+    bad = flat.str.contains(_NON_NUMERIC_PATTERN, regex=True) & ~flat.str.lower().isin(
+        _SPECIAL_NUMERIC_VALUES
+    )
+    return bad.to_numpy().reshape(values.shape, order="F").any(axis=0)
+
+
+def _numeric_hint_columns(columns, expected_headers):
+    known = {header.lower().strip() for header in expected_headers or ()}
+    return {
+        col for col in columns
+        if col in known and col.startswith(_NUMERIC_HEADER_PREFIXES)
+    }
+
+
+def _compact_text_columns(result, text):
+    """
+    Store low-cardinality text columns (gene, disease, country, genotype, the yes/no
+    symptom columns, ...) as categoricals.
+
+    With fewer than 128 categories pandas keeps int8 codes, so equality masks and
+    isin compare small integers instead of Python strings. Missing values (the
+    former None) become the categorical NaN.
+    """
+    for col in text:
+        series = result[col]
+        present = series.count()
+        if present == 0 or series.nunique() > present * CATEGORY_MAX_RATIO:
+            continue
+        result[col] = series.astype("category")
+
+
+def expand_categoricals(df):
+    """
+    Return df with its categorical columns turned back into object columns that
+    hold None for missing values, i.e. as normalize_dataframe produced them
+    before compaction. For row-wise code that tests values with `is None`/`in`.
+    """
+    columns = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not columns:
+        return df
+
+    block = np.empty((len(df), len(columns)), dtype=object)
+    for j, col in enumerate(columns):
+        categorical = df[col].array
+        # Code -1 (missing) picks the trailing None
+        labels = np.append(categorical.categories.to_numpy(dtype=object), None)
+        block[:, j] = labels[categorical.codes]
+
+    expanded = pd.DataFrame(block, index=df.index, columns=columns)
+    return pd.concat([df.drop(columns=columns), expanded], axis=1)[df.columns]
+
+
+def normalize_dataframe(df, valid_genes, expected_headers=None):
+    """
+    Normalize a freshly read MDSGene sheet.
+
+    Produces exactly the same frame as the former per-column loop (strip every
+    value, keep a column numeric only if all of it parses, collapse integral
+    floats to int64, map the -99 sentinel to NaN/None), but decides the column
+    types in batched passes instead of one try/except per column. Repetitive
+    text columns are then stored as categoricals, see _compact_text_columns,
+    and the genotype flags, filter bitmaps and levodopa category (genotypes,
+    filter_bitmaps, levodopa) are appended.
+
+    Returns the normalized DataFrame and a dict of per-stage timings in seconds.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def mark(stage):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = now - started
+        started = now
+
+    df.columns = df.columns.str.lower().str.strip()
+
+    if valid_genes:
+        _mask_foreign_gene_slots(df, valid_genes)
+    mark("gene_slots")
+
+    columns = list(df.columns)
+    result = {}
+
+    if 'pmid' in df.columns:
+        pmid = df['pmid'].astype(str).str.strip()
+        result['pmid'] = pmid.replace("-99", None)
+
+    # Int columns and NaN-free float columns round-trip through str unchanged,
+    # so they keep their dtype. Everything else is parsed from its string form,
+    # including float columns with NaN, whose 'nan' strings never parse.
+    native_columns = []
+    string_columns = []
+    for col in columns:
+        if col == 'pmid':
+            continue
+        dtype = df[col].dtype
+        if dtype == "int64" or (dtype == "float64" and not df[col].isna().any()):
+            native_columns.append(col)
+        else:
+            string_columns.append(col)
+
+    stripped = _strip_block(df[string_columns]) if string_columns else np.empty((len(df), 0), dtype=object)
+    mark("stringify")
+
+    # Sample first, then validate the surviving candidates over all rows
+    hinted = _numeric_hint_columns(string_columns, expected_headers)
+    sampled = _text_columns(stripped[:SAMPLE_SIZE])
+    candidates = [
+        idx for idx, col in enumerate(string_columns)
+        if col in hinted or not sampled[idx]
+    ]
+    if candidates:
+        rejected = _text_columns(stripped[:, candidates])
+        candidates = [idx for idx, bad in zip(candidates, rejected) if not bad]
+    mark("infer")
+
+    numeric = {col: df[col] for col in native_columns}
+    text = {}
+    candidate_set = set(candidates)
+    for idx, col in enumerate(string_columns):
+        series = pd.Series(stripped[:, idx], index=df.index, name=col)
+        if idx in candidate_set:
+            try:
+                numeric[col] = pd.to_numeric(series, errors="raise")
+                continue
+            except (ValueError, TypeError):
+                pass
+        text[col] = series
+
+    for col, series in numeric.items():
+        if series.dtype == "float64" and series.notna().all() and (series % 1 == 0).all():
+            numeric[col] = series.astype("int64")
+    mark("convert")
+
+    # Find every column holding the -99 sentinel with one comparison per dtype
+    with_sentinel = set()
+    for dtype in ["int64", "float64"]:
+        same_dtype = [col for col, series in numeric.items() if series.dtype == dtype]
+        if same_dtype:
+            block = np.column_stack([numeric[col].to_numpy() for col in same_dtype])
+            hits = (block == -99).any(axis=0)
+            with_sentinel.update(col for col, hit in zip(same_dtype, hits) if hit)
+
+    for col, series in numeric.items():
+        if col in with_sentinel:
+            values = series.to_numpy(dtype="float64", copy=True)
+            values[values == -99] = np.nan
+            series = pd.Series(values, index=series.index, name=series.name)
+        result[col] = series
+    for col, series in text.items():
+        result[col] = series.replace("-99", None)
+    mark("sentinels")
+
+    _compact_text_columns(result, text)
+    mark("compact")
+
+    normalized = pd.DataFrame({col: result[col] for col in columns}, index=df.index)
+    mark("assemble")
+
+    # Classified once per load, so genotype filters are plain column lookups
+    normalized = add_genotype_flags(normalized)
+    normalized = add_filter_bitmaps(normalized)
+    mark("bitmaps")
+
+    normalized = add_levodopa_category(normalized)
+    mark("levodopa")
+
+    return normalized, timings
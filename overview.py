@@ -1,12 +1,14 @@
 import numpy as np
-import os
+import pandas as pd
 import logging
 import re
 
 import mutation_details
+from cohort_manifest import get_cohort_frames
+from query_plan import carries_gene
 from utils import (
-    get_cached_dataframe,
     apply_filter,
+    expand_categoricals,
     safe_get,
     extract_year
 )
@@ -32,11 +34,16 @@ def to_python_type(value):
 
 # Изменена функция get_mutations - добавлен параметр gene
 def get_mutations(df, gene):
+    return get_row_mutations([row for _, row in df.iterrows()], gene)
+
+
+def get_row_mutations(rows, gene):
+    """get_mutations of a study given as its list of rows (Series or column -> value dicts), in sheet order."""
     mutations = []
 
     # Добавляем внешний цикл по типам мутаций
     for mutation_type in ['p', 'c', 'g']:
-        for _, row in df.iterrows():
+        for row in rows:
             # Инициализируем списки для каждого пациента
             patient_mutations = []
             het_mutations = []  # Важно: объявляем список здесь!
@@ -154,6 +161,47 @@ def find_author_year_column(columns):
     return matching_columns[0] if matching_columns else None
 
 
+def disease_matcher(disease_abbrev):
+    """Predicate for disease_abbrev values that contain every "_"-separated part, case-insensitively."""
+    disease_parts = [part.lower() for part in disease_abbrev.split("_")]
+
+    def matches_disease(value):
+        return all(part in value.lower() for part in disease_parts)
+
+    return matches_disease
+
+
+FULL_MUTATION_COLUMNS = [
+    "mut1_p", "mut2_p", "mut3_p",
+    "mut1_g", "mut2_g", "mut3_g",
+    "mut1_c", "mut2_c", "mut3_c",
+    "mut1_genotype", "mut2_genotype", "mut3_genotype",
+]
+
+
+def first_values(df, column, first_rows, default):
+    """safe_get of `column` at every position in first_rows; the default for all if the column is missing."""
+    if column not in df.columns:
+        return [default] * len(first_rows)
+    values = df[column]
+    return [safe_get(values, None, position, default) for position in first_rows]
+
+
+def aao_mean_std(values):
+    """
+    Rounded mean and standard deviation of a study's known ages at onset (-99
+    and None without enough of them). Same float arithmetic as Series.mean()
+    and Series.std(), so a .5 rounds the way it did.
+    """
+    if len(values) == 0:
+        return -99, None
+    mean = values.sum() / len(values)
+    if len(values) == 1:
+        return round(mean), None
+    variance = ((mean - values) ** 2).sum() / (len(values) - 1)
+    return round(mean), round(np.sqrt(variance))
+
+
 def get_unique_studies(
     disease_abbrev: str,
     gene: str,
@@ -162,6 +210,7 @@ def get_unique_studies(
     country: str = None,
     mutation: str = None,
     directory: str = "excel",
+    frames=None,
 ):
     results = []
 
@@ -172,125 +221,127 @@ def get_unique_studies(
     # Split disease_abbrev by underscore and convert each part to lowercase for case-insensitive comparison
     disease_parts = [part.lower() for part in disease_abbrev.split("_")]
 
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue
-
-        if filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = get_cached_dataframe(file_path)
-                print(f"\nProcessing file: {filename}")
-                print(f"Initial DataFrame shape: {df.shape}")
-
-                df = df[df["mdsgene_decision"] == "IN"]
-                df = df[
-                    df["disease_abbrev"]
-                    .str.lower()
-                    .apply(lambda x: all(part in x for part in disease_parts))
-                    & (
-                        (df["gene1"] == gene)
-                        | (df["gene2"] == gene)
-                        | (df["gene3"] == gene)
-                    )
-                ]
-
-                print(f"DataFrame shape after initial filtering: {df.shape}")
-                df = apply_filter(df, filter_criteria, aao, country, mutation)
-                print(f"DataFrame shape after apply_filter: {df.shape}")
-
-                # Find the author/year column
-                author_year_col = find_author_year_column(df.columns)
-
-                for pmid in df["pmid"].unique():
-                    try:
-                        study_df = df[df["pmid"] == pmid]
-                        number_of_cases = len(study_df)
-                        study_design = safe_get(study_df, "study_design", 0, "Unknown")
-                        ethnicity = safe_get(study_df, "ethnicity", 0, -99)
-
-                        # Use the detected column name or fall back to "Unknown"
-                        author_year = (
-                            study_df[author_year_col].iloc[0]
-                            if author_year_col is not None
-                            else "Unknown"
-                        )
-
-                        sex_data = study_df["sex"].value_counts()
-                        total_with_sex = sex_data.sum()
-                        proportion_of_male_patients = (
-                            -99
-                            if (study_df["sex"] == -99).all()
-                            else (
-                                sex_data.get("male", 0) / total_with_sex
-                                if total_with_sex > 0
-                                else -99
-                            )
+    if frames is None:
+        frames = get_cohort_frames(
+            directory, gene, disease_match=disease_matcher(disease_abbrev), mutations=mutation
+        )
+    for filename, df in frames:
+        try:
+            print(f"\nProcessing file: {filename}")
+            print(f"Initial DataFrame shape: {df.shape}")
+
+            df = df[df["mdsgene_decision"] == "IN"]
+            df = df[
+                df["disease_abbrev"]
+                .str.lower()
+                .apply(lambda x: all(part in x for part in disease_parts))
+                & carries_gene(df, gene)
+            ]
+
+            print(f"DataFrame shape after initial filtering: {df.shape}")
+            df = apply_filter(df, filter_criteria, aao, country, mutation)
+            print(f"DataFrame shape after apply_filter: {df.shape}")
+
+            # The per-study code below reads single values and iterates rows
+            df = expand_categoricals(df)
+
+            # Find the author/year column
+            author_year_col = find_author_year_column(df.columns)
+
+            # One group per PMID, in order of first appearance; rows without a PMID belong to no study
+            codes, pmids = pd.factorize(df["pmid"])
+            study_count = len(pmids)
+            in_study = codes >= 0
+            # Positions of study k in sheet order: order[bounds[k]:bounds[k + 1]]
+            order = np.argsort(codes, kind="stable")[np.count_nonzero(~in_study):]
+            cases = np.bincount(codes[in_study], minlength=study_count)
+            bounds = np.concatenate([[0], np.cumsum(cases)])
+            first_rows = order[bounds[:-1]]
+
+            def per_study(mask):
+                return np.bincount(codes[in_study & np.asarray(mask, dtype=bool)], minlength=study_count)
+
+            sex = df["sex"]
+            male_count = per_study(sex == "male")
+            with_sex_count = per_study(sex.notna())
+            unknown_sex_count = per_study(sex == -99)
+            aao_values = df["aao"].replace(-99, np.nan).to_numpy(dtype=np.float64)
+
+            pmid_values = df["pmid"]
+            author_years = (
+                [df[author_year_col].iloc[position] for position in first_rows]
+                if author_year_col is not None
+                else ["Unknown"] * study_count
+            )
+            study_designs = first_values(df, "study_design", first_rows, "Unknown")
+            ethnicities = first_values(df, "ethnicity", first_rows, -99)
+            full_mutation_values = {
+                column: first_values(df, column, first_rows, "Unknown")
+                for column in FULL_MUTATION_COLUMNS
+            }
+
+            # Rows are materialized once per file and handed to each study's mutations;
+            # plain dicts hold the values iterrows would and answer row.get() much faster
+            columns = list(df.columns)
+            rows = [dict(zip(columns, values)) for values in df.to_numpy(dtype=object)]
+
+            for k, first_row in enumerate(first_rows):
+                pmid = pmid_values.iloc[first_row]
+                try:
+                    positions = order[bounds[k]:bounds[k + 1]]
+                    number_of_cases = cases[k]
+
+                    proportion_of_male_patients = (
+                        -99
+                        if unknown_sex_count[k] == number_of_cases
+                        else (
+                            male_count[k] / with_sex_count[k]
+                            if with_sex_count[k] > 0
+                            else -99
                         )
+                    )
 
-                        aao_values = study_df["aao"].replace(-99, np.nan).dropna()
-                        mean_age_at_onset = (
-                            round(aao_values.mean()) if not aao_values.empty else -99
-                        )
-                        std_dev_age_at_onset = (
-                            round(aao_values.std())
-                            if not aao_values.empty and len(aao_values) > 1
-                            else None
-                        )
+                    study_aao = aao_values[positions]
+                    mean_age_at_onset, std_dev_age_at_onset = aao_mean_std(
+                        study_aao[~np.isnan(study_aao)]
+                    )
 
-                        # ИЗМЕНЕНИЕ 3: передаем параметр gene в функцию get_mutations
-                        mutations = get_mutations(study_df, gene)  # <<<< Добавлен параметр gene
-                        unique_mutations = get_unique_mutations(mutations)
-
-                        full_mutations = {
-                            "mut1_p": safe_get(study_df, "mut1_p", 0, "Unknown"),
-                            "mut2_p": safe_get(study_df, "mut2_p", 0, "Unknown"),
-                            "mut3_p": safe_get(study_df, "mut3_p", 0, "Unknown"),
-                            "mut1_g": safe_get(study_df, "mut1_g", 0, "Unknown"),
-                            "mut2_g": safe_get(study_df, "mut2_g", 0, "Unknown"),
-                            "mut3_g": safe_get(study_df, "mut3_g", 0, "Unknown"),
-                            "mut1_c": safe_get(study_df, "mut1_c", 0, "Unknown"),
-                            "mut2_c": safe_get(study_df, "mut2_c", 0, "Unknown"),
-                            "mut3_c": safe_get(study_df, "mut3_c", 0, "Unknown"),
-                            "mut1_genotype": safe_get(
-                                study_df, "mut1_genotype", 0, "Unknown"
-                            ),
-                            "mut2_genotype": safe_get(
-                                study_df, "mut2_genotype", 0, "Unknown"
-                            ),
-                            "mut3_genotype": safe_get(
-                                study_df, "mut3_genotype", 0, "Unknown"
-                            ),
-                        }
-                        result = {
-                            "pmid": to_python_type(pmid),
-                            "author_year": author_year,
-                            "study_design": study_design,
-                            "number_of_cases": int(number_of_cases),
-                            "ethnicity": to_python_type(ethnicity),
-                            "proportion_of_male_patients": to_python_type(
-                                proportion_of_male_patients
-                            ),
-                            "full_mutations": full_mutations,
-                            "mean_age_at_onset": to_python_type(mean_age_at_onset),
-                            "std_dev_age_at_onset": to_python_type(
-                                std_dev_age_at_onset
-                            ),
-                            "mutations": unique_mutations,
-                        }
-
-                        results.append(result)
-                    except Exception as e:
-                        logger.error(
-                            f"❌ Error processing PMID {pmid} in file {filename}: {str(e)}"
-                        )
-                        logger.exception("Detailed error:")
-                        continue
+                    # ИЗМЕНЕНИЕ 3: передаем параметр gene в функцию get_mutations
+                    mutations = get_row_mutations([rows[position] for position in positions], gene)
+                    unique_mutations = get_unique_mutations(mutations)
+
+                    full_mutations = {
+                        column: values[k] for column, values in full_mutation_values.items()
+                    }
+                    result = {
+                        "pmid": to_python_type(pmid),
+                        "author_year": author_years[k],
+                        "study_design": study_designs[k],
+                        "number_of_cases": int(number_of_cases),
+                        "ethnicity": to_python_type(ethnicities[k]),
+                        "proportion_of_male_patients": to_python_type(
+                            proportion_of_male_patients
+                        ),
+                        "full_mutations": full_mutations,
+                        "mean_age_at_onset": to_python_type(mean_age_at_onset),
+                        "std_dev_age_at_onset": to_python_type(
+                            std_dev_age_at_onset
+                        ),
+                        "mutations": unique_mutations,
+                    }
+
+                    results.append(result)
+                except Exception as e:
+                    logger.error(
+                        f"❌ Error processing PMID {pmid} in file {filename}: {str(e)}"
+                    )
+                    logger.exception("Detailed error:")
+                    continue
 
-            except Exception as e:
-                logger.error(f"❌ Error reading file {filename}: {str(e)}")
-                logger.exception("Detailed error:")
-                continue
+        except Exception as e:
+            logger.error(f"❌ Error reading file {filename}: {str(e)}")
+            logger.exception("Detailed error:")
+            continue
 
     results.sort(key=lambda x: extract_year(x["author_year"]), reverse=True)
     print(f"Total number of results: {len(results)}")
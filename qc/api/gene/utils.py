@@ -9,10 +9,11 @@ import math
 from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 from qc.config import properties_directory
+import dataset_cache
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
-_dataframe_cache = {}
+QC_VARIANT = "qc"
 
 
 # List of expected headers extracted from the provided code
@@ -472,33 +473,24 @@ def translate_column_names(df):
     return df
 
 
-def get_cached_dataframe(file_path):
-    global _dataframe_cache
-
-    try:
-        file_mod_time = os.path.getmtime(file_path)
-        if (
-                file_path in _dataframe_cache
-                and _dataframe_cache[file_path]["mod_time"] == file_mod_time
-        ):
-            return _dataframe_cache[file_path]["dataframe"]
+def _load_qc_dataframe(file_path):
+    df = dataset_cache.get_raw_workbook(file_path).copy()
 
-        _, file_extension = os.path.splitext(file_path)
-        engine = "openpyxl" if file_extension.lower() == ".xlsx" else "xlrd"
+    # Convert all headers to lower case
+    df.columns = df.columns.str.lower()
 
-        df = pd.read_excel(file_path, engine=engine)
+    for col in df.columns:
+        if df[col].dtype in ["int64", "float64"]:
+            df[col] = df[col].replace(-99, np.nan)
+        else:
+            df[col] = df[col].replace("-99", None)
 
-        # Convert all headers to lower case
-        df.columns = df.columns.str.lower()
+    return df
 
-        for col in df.columns:
-            if df[col].dtype in ["int64", "float64"]:
-                df[col] = df[col].replace(-99, np.nan)
-            else:
-                df[col] = df[col].replace("-99", None)
 
-        _dataframe_cache[file_path] = {"dataframe": df, "mod_time": file_mod_time}
-        return df
+def get_cached_dataframe(file_path):
+    try:
+        return dataset_cache.get_dataset(file_path, QC_VARIANT, _load_qc_dataframe)
 
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
@@ -5,6 +5,7 @@ import json
 
 from fastapi import APIRouter, HTTPException, Form, UploadFile, File
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 
 from qc.api.gene.merge_symptoms import merge_symptoms, MergeSymptomRequest
@@ -20,6 +21,8 @@ import shutil
 import pandas as pd
 from collections import OrderedDict
 
+import dataset_watcher
+
 router = APIRouter()
 
 @router.get("/list_excel_files", response_model=List[str])
@@ -49,6 +52,7 @@ async def update_excel_file(fileId: str = Form(...), newFile: UploadFile = File(
 
     try:
         await update_excel_file_content(fileId, newFile)
+        dataset_watcher.drop_workbook(os.path.join("excel", fileId))
         return JSONResponse(content={"message": "File updated successfully"})
     except FileNotFoundError:
         return JSONResponse(status_code=404, content={"error": "File not found"})
@@ -89,6 +93,9 @@ async def upload_gene_excel_file(file: UploadFile = File(...)):
         # Сохраняем файл и получаем имена колонок
         file_path = os.path.join("excel", file.filename)
         column_names = gene_excel_file.save_file(file)
+        # The watcher only catches up after its debounce; the cached frames must
+        # hold the new upload before the symptom categories are read from them
+        await run_in_threadpool(dataset_watcher.refresh_workbook, file_path)
 
         # Обновляем категории симптомов для загруженного файла
         try:
@@ -113,6 +120,7 @@ async def web_delete_excel_file(file_id : str):
     logger.debug(f"Received file_id: {file_id}")
     file_path = f"excel/{file_id}"
     if delete_excel_file.delete(file_path):
+        dataset_watcher.drop_workbook(file_path)
         return {"message": "File deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="File not found")
@@ -135,6 +143,8 @@ async def delete_columns(request: DeleteColumnsRequest):
 
         # Удаляем колонки из файла
         success = gene_excel_file.delete_columns(file_path, request.columns)
+        if success:
+            dataset_watcher.drop_workbook(file_path)
 
         if success:
             # Получаем обновленный список колонок
@@ -318,6 +328,7 @@ def rename_symptom_endpoint(request: RenameSymptomRequest):
                 df[col].replace({old_name: new_name}, inplace=True, regex=True)
 
         df.to_excel(excel_file_path, index=False)
+        dataset_watcher.drop_workbook(excel_file_path)
         return {"message": f"Symptom '{old_name}' renamed to '{new_name}' successfully."}
 
     except Exception as e:
@@ -0,0 +1,96 @@
+"""
+Row selection for the chart aggregators.
+
+A chart used to slice its frame once per step (mdsgene_decision, apply_filter,
+disease and gene, clinical status, pathogenicity), copying every column each
+time. A plan is the list of those steps as predicates: callables that take the
+whole cohort frame and return a boolean mask aligned with it, or None when they
+do not restrict the rows. select_rows ANDs them into one mask and materializes
+the rows once, with only the columns the aggregator reads.
+"""
+
+import numpy as np
+
+from utils import filter_mask
+
+
+def included(df):
+    return df["mdsgene_decision"] == "IN"
+
+
+def included_if_present(df):
+    if "mdsgene_decision" not in df.columns:
+        return None
+    return included(df)
+
+
+def affected(df):
+    return df["status_clinical"] != "clinically unaffected"
+
+
+def affected_if_present(df):
+    if "status_clinical" not in df.columns:
+        return None
+    return affected(df)
+
+
+def not_benign(df):
+    return (
+        (df["pathogenicity1"] != "benign")
+        & (df["pathogenicity2"] != "benign")
+        & (df["pathogenicity3"] != "benign")
+    )
+
+
+def user_filters(filter_criteria, aao, countries, mutations):
+    """apply_filter as a predicate; None unless a criterion, country or mutation is given."""
+    if filter_criteria is None and countries is None and mutations is None:
+        return None
+    return lambda df: filter_mask(df, filter_criteria, aao, countries, mutations)
+
+
+def carries_gene(df, gene):
+    """
+    Rows with `gene` in any of the gene1/gene2/gene3 slots, as one mask. Every
+    row counts once, also a patient whose values equal another's.
+    """
+    return (df["gene1"] == gene) | (df["gene2"] == gene) | (df["gene3"] == gene)
+
+
+def in_rows(rows):
+    """Rows whose index label is one of `rows`, e.g. the carriers of get_gene_frames."""
+    return lambda df: df.index.isin(rows)
+
+
+def in_cohort(disease_abbrev, gene, disease_optional=False):
+    """Rows of the disease that carry `gene`, see carries_gene."""
+
+    def predicate(df):
+        gene_mask = carries_gene(df, gene)
+        if disease_optional and "disease_abbrev" not in df.columns:
+            return gene_mask
+        return (df["disease_abbrev"] == disease_abbrev) & gene_mask
+
+    return predicate
+
+
+def select_rows(df, plan, columns=None):
+    """
+    Evaluate every predicate of the plan against df and return the rows that
+    satisfy all of them. With `columns`, only those of them that df has are
+    kept; the callers check for optional columns as they did before.
+    """
+    mask = None
+    for predicate in plan:
+        if predicate is None:
+            continue
+        condition = predicate(df)
+        if condition is None:
+            continue
+        condition = np.asarray(condition, dtype=bool)
+        mask = condition if mask is None else mask & condition
+
+    if columns is not None:
+        columns = [col for col in columns if col in df.columns]
+        return df[columns] if mask is None else df.loc[mask, columns]
+    return df if mask is None else df[mask]
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:
+    # No file locks (Windows): concurrent workers may parse the same workbook twice
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Directory where normalized DataFrames are persisted between process starts and shared
+# by all workers of one host
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join("cache", "snapshots"))
+
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Hash the content of a workbook together with its file name.
+
+    The file name is part of the key because the normalization step derives the
+    list of valid genes from it, so the same bytes under another name normalize
+    differently.
+    """
+    digest = hashlib.sha256(os.path.basename(file_path).encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def workbook_key(file_path):
+    """Short stable key of a workbook's path; every snapshot of the workbook starts with it."""
+    return hashlib.sha256(os.path.normpath(file_path).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_key(file_path):
+    """Key of the workbook's current content: "<workbook_key>_<file_content_hash>"."""
+    return f"{workbook_key(file_path)}_{file_content_hash(file_path)}"
+
+
+def get_snapshot_path(key, normalization_version):
+    return os.path.join(SNAPSHOT_DIR, f"{key}_v{normalization_version}.arrow")
+
+
+def _lock_name(key):
+    return f"{key}.lock"
+
+
+def _remove_snapshot_files(filenames):
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(SNAPSHOT_DIR, filename))
+        except OSError as e:
+            # e.g. still mapped on a platform that does not allow removing it
+            logger.debug(f"Could not remove snapshot file {filename}: {str(e)}")
+
+
+def remove_outdated_snapshots(key, normalization_version):
+    """
+    Remove the other snapshots and locks of the same workbook: those of its
+    earlier contents and of other normalization versions. Processes that still
+    map a removed file keep reading it.
+    """
+    prefix = f"{key.split('_')[0]}_"
+    keep = {os.path.basename(get_snapshot_path(key, normalization_version)), _lock_name(key)}
+    try:
+        filenames = os.listdir(SNAPSHOT_DIR)
+    except OSError:
+        return
+    _remove_snapshot_files(
+        filename for filename in filenames
+        if filename.startswith(prefix) and filename not in keep and not filename.endswith(".tmp")
+    )
+
+
+def prune_snapshots(normalization_version, file_paths):
+    """
+    Remove the snapshots that belong to none of `file_paths` or to another
+    normalization version, e.g. at startup, and every lock without a kept
+    snapshot. Earlier contents of a listed workbook go once its new snapshot
+    is saved.
+    """
+    try:
+        filenames = os.listdir(SNAPSHOT_DIR)
+    except OSError:
+        return
+    keys = {workbook_key(file_path) for file_path in file_paths}
+    current = f"_v{normalization_version}.arrow"
+    kept = {
+        filename[: -len(current)] for filename in filenames
+        if filename.endswith(current) and filename.split("_")[0] in keys
+    }
+    _remove_snapshot_files(
+        filename for filename in filenames
+        if not filename.endswith(".tmp")
+        and not (filename.endswith(current) and filename[: -len(current)] in kept)
+        and not (filename.endswith(".lock") and filename[: -len(".lock")] in kept)
+    )
+
+
+def _to_arrow_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Keep NaN as a float value rather than a null, so these columns convert back without a copy
+    for i, name in enumerate(table.column_names):
+        if df[name].dtype == "float64":
+            table = table.set_column(i, name, pa.array(df[name].to_numpy(), from_pandas=False))
+    return table
+
+
+def load_snapshot(key, normalization_version):
+    """
+    Return the persisted normalized DataFrame, or None if there is no usable snapshot.
+
+    The Arrow IPC file is memory-mapped, so numeric columns point straight into
+    the page cache, which every worker process mapping the same file shares.
+    Those columns are read-only.
+    """
+    snapshot_path = get_snapshot_path(key, normalization_version)
+    if not os.path.exists(snapshot_path):
+        return None
+
+    try:
+        source = pa.memory_map(snapshot_path, "r")
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot {snapshot_path}: {str(e)}")
+        return None
+
+
+def save_snapshot(df, key, normalization_version):
+    """
+    Persist a normalized DataFrame and drop the workbook's outdated snapshots;
+    failures are logged and never raised.
+    """
+    snapshot_path = get_snapshot_path(key, normalization_version)
+    # Write to a temporary file first so concurrent workers never read a partial snapshot
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        table = _to_arrow_table(df)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, snapshot_path)
+        remove_outdated_snapshots(key, normalization_version)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write snapshot {snapshot_path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+@contextmanager
+def snapshot_lock(key):
+    """
+    Hold an exclusive lock for one snapshot across processes, so that of several
+    workers starting together only one parses the workbook and the others wait
+    for its snapshot.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, _lock_name(key)), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-import os
 import logging
 import math
-from utils import get_cached_dataframe, apply_filter
+from utils import apply_filter, expand_categoricals
+from cohort_manifest import get_cohort_frames
+from query_plan import carries_gene
 from mutation_details import handle_value, get_data_for_mutation_from_row
 
 logging.basicConfig(level=logging.DEBUG)
@@ -91,19 +92,10 @@ def get_patients_for_publication(
     disease_abbrev = disease_abbrev.upper()
     logger.debug(f"Searching for disease: {disease_abbrev}, gene: {gene}, pmid: {pmid}")
 
-    for filename in os.listdir(directory):
-        if (
-            filename.startswith(".~")
-            or filename.startswith("~$")
-            or not (filename.endswith(".xlsx") or filename.endswith(".xls"))
-        ):
-            continue
-
-        file_path = os.path.join(directory, filename)
+    for filename, df in get_cohort_frames(directory, gene, disease_abbrev, pmid=pmid, mutations=mutation):
         logger.debug(f"Processing file: {filename}")
 
         try:
-            df = get_cached_dataframe(file_path)
             logger.debug(f"Dataframe shape after loading: {df.shape}")
             logger.debug(f"Available columns: {df.columns.tolist()}")
 
@@ -117,11 +109,7 @@ def get_patients_for_publication(
 
             filtered_df = df[
                 (df["disease_abbrev"] == disease_abbrev)
-                & (
-                    (df["gene1"] == gene)
-                    | (df["gene2"] == gene)
-                    | (df["gene3"] == gene)
-                )
+                & carries_gene(df, gene)
                 & (df["pmid"] == pmid)
             ]
 
@@ -141,7 +129,7 @@ def get_patients_for_publication(
                     f"Dataframe shape after applying additional filters: {filtered_df.shape}"
                 )
 
-            for idx, row in filtered_df.iterrows():
+            for idx, row in expand_categoricals(filtered_df).iterrows():
                 symptoms = [
                     handle_value(col.replace("_sympt", "").replace("_hp", ""))
                     for col in filtered_df.columns
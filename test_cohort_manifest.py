@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+import cohort_manifest
+from utils import filter_mask, get_cached_dataframe
+
+DIRECTORIES = ["excel", "excel1", "excel2"]
+MUTATION_COLUMNS = [f"mut{i}_{level}" for i in range(1, 4) for level in ("p", "c", "g")]
+
+
+@pytest.fixture(autouse=True)
+def repository_root(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+def full_scan(directory, gene, disease_abbrev, pmid=None, mutation=None, mutations=None):
+    """{filename: row labels} of the cohort, read from every workbook without the index."""
+    cohort = {}
+    for filename in cohort_manifest.list_workbooks(directory):
+        df = get_cached_dataframe(os.path.join(directory, filename))
+        mask = (
+            (df["mdsgene_decision"] == "IN")
+            & (df["disease_abbrev"].astype(str).str.upper() == disease_abbrev.upper())
+            & ((df["gene1"] == gene) | (df["gene2"] == gene) | (df["gene3"] == gene))
+        )
+        if pmid is not None:
+            mask &= df["pmid"] == pmid
+        if mutation is not None:
+            carries = False
+            for col in MUTATION_COLUMNS:
+                if col in df.columns:
+                    carries = carries | (df[col] == mutation)
+            mask &= carries
+        mutations_mask = filter_mask(df, None, None, None, mutations)
+        if mutations_mask is not None:
+            mask &= mutations_mask
+        if mask.any():
+            cohort[filename] = df.index[mask.to_numpy()].tolist()
+    return cohort
+
+
+def indexed(directory, gene, disease_abbrev, **kwargs):
+    return {
+        filename: df.index.tolist()
+        for filename, df in cohort_manifest.get_cohort_frames(directory, gene, disease_abbrev, **kwargs)
+    }
+
+
+def cohorts(directory):
+    master = cohort_manifest.get_master_table(directory)
+    return [
+        (gene, disease)
+        for gene, by_disease in master["genes"].items()
+        for disease in by_disease
+        if isinstance(gene, str) and isinstance(disease, str)
+    ]
+
+
+@pytest.mark.parametrize("directory", DIRECTORIES)
+def test_get_cohort_frames_matches_full_scan(directory):
+    pairs = cohorts(directory)
+    assert pairs
+    for gene, disease in pairs:
+        assert indexed(directory, gene, disease) == full_scan(directory, gene, disease), (gene, disease)
+
+
+@pytest.mark.parametrize("directory", DIRECTORIES)
+def test_get_cohort_frames_unknown_cohort(directory):
+    assert indexed(directory, "NOPE", "EA") == {}
+    gene, _ = cohorts(directory)[0]
+    assert indexed(directory, gene, "NOPE") == {}
+
+
+@pytest.mark.parametrize("directory", DIRECTORIES)
+def test_get_cohort_frames_by_pmid_and_mutation(directory):
+    gene, disease = cohorts(directory)[0]
+    patients = cohort_manifest.get_cohort_rows(directory, gene, disease)
+    for pmid in list(patients["pmid"].dropna().unique())[:5] + ["no such pmid"]:
+        assert indexed(directory, gene, disease, pmid=pmid) == full_scan(
+            directory, gene, disease, pmid=pmid
+        ), pmid
+
+    identifiers = [
+        value for value in patients[MUTATION_COLUMNS].to_numpy().ravel() if isinstance(value, str)
+    ]
+    for mutation in list(dict.fromkeys(identifiers))[:5] + ["p.Nope1Nope"]:
+        assert indexed(directory, gene, disease, mutation=mutation) == full_scan(
+            directory, gene, disease, mutation=mutation
+        ), mutation
+
+
+@pytest.mark.parametrize("directory", DIRECTORIES)
+def test_get_cohort_frames_by_mutations_filter(directory):
+    for gene, disease in cohorts(directory):
+        patients = cohort_manifest.get_cohort_rows(directory, gene, disease)
+        identifiers = list(
+            dict.fromkeys(
+                value for value in patients[MUTATION_COLUMNS].to_numpy().ravel() if isinstance(value, str)
+            )
+        )[:3]
+        filters = ["pathogenic", "Likely Pathogenic, VUS", "none", "nan", "", "p.Nope1Nope"]
+        filters += identifiers + [identifier.upper() for identifier in identifiers]
+        if len(identifiers) > 1:
+            filters.append(f" {identifiers[0]} ,{identifiers[1]}")
+        for mutations in filters:
+            assert indexed(directory, gene, disease, mutations=mutations) == full_scan(
+                directory, gene, disease, mutations=mutations
+            ), (gene, disease, mutations)
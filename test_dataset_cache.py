@@ -0,0 +1,131 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache, dataframe_size
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    paths = []
+    for name in ["a.xlsx", "b.xlsx", "c.xlsx"]:
+        path = tmp_path / name
+        path.write_bytes(b"")
+        paths.append(str(path))
+    return paths
+
+
+def frame(rows):
+    return pd.DataFrame({"value": range(rows)})
+
+
+class Loader:
+    """Counts the frames it builds; each one has `rows` int64 rows."""
+
+    def __init__(self, rows=100):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, file_path):
+        self.calls.append(file_path)
+        return frame(self.rows)
+
+
+def test_get_loads_once(workbooks):
+    cache = DatasetCache()
+    loader = Loader()
+    first = cache.get(workbooks[0], "normalized", loader)
+    assert cache.get(workbooks[0], "normalized", loader) is first
+    assert loader.calls == [workbooks[0]]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_variants_are_separate_entries(workbooks):
+    cache = DatasetCache()
+    loader = Loader()
+    raw = cache.get(workbooks[0], "raw", loader)
+    normalized = cache.get(workbooks[0], "normalized", loader)
+    assert raw is not normalized
+    assert sorted(cache.cached_variants(workbooks[0])) == ["normalized", "raw"]
+
+
+def test_evicts_least_recently_used_over_budget(workbooks):
+    size = dataframe_size(frame(100))
+    cache = DatasetCache(max_bytes=2 * size)
+    loader = Loader()
+    a, b, c = workbooks
+
+    cache.get(a, "normalized", loader)
+    cache.get(b, "normalized", loader)
+    # Touch a, so b is now the least recently used
+    cache.get(a, "normalized", loader)
+    cache.get(c, "normalized", loader)
+
+    assert cache.cached_variants(a) == ["normalized"]
+    assert cache.cached_variants(b) == []
+    assert cache.cached_variants(c) == ["normalized"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 2 * size
+
+
+def test_keeps_single_entry_over_budget(workbooks):
+    cache = DatasetCache(max_bytes=1)
+    loader = Loader()
+    df = cache.get(workbooks[0], "normalized", loader)
+    assert cache.get(workbooks[0], "normalized", loader) is df
+    assert cache.stats()["entries"] == 1
+
+    cache.get(workbooks[1], "normalized", loader)
+    assert cache.cached_variants(workbooks[0]) == []
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalidate_variant_of_one_file(workbooks):
+    cache = DatasetCache()
+    loader = Loader()
+    a, b, _ = workbooks
+    for path in (a, b):
+        cache.get(path, "raw", loader)
+        cache.get(path, "normalized", loader)
+
+    cache.invalidate(a, "raw")
+    assert cache.cached_variants(a) == ["normalized"]
+    assert sorted(cache.cached_variants(b)) == ["normalized", "raw"]
+
+    cache.invalidate(b)
+    assert cache.cached_variants(b) == []
+    assert cache.cached_variants(a) == ["normalized"]
+
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_modified_file_is_reloaded(workbooks):
+    cache = DatasetCache()
+    loader = Loader()
+    path = workbooks[0]
+    first = cache.get(path, "normalized", loader)
+
+    mtime = os.path.getmtime(path)
+    os.utime(path, (mtime + 10, mtime + 10))
+    assert cache.get(path, "normalized", loader) is not first
+    assert len(loader.calls) == 2
+
+
+def test_without_mtime_check_serves_cached_frame(workbooks):
+    cache = DatasetCache()
+    cache.check_mtime = False
+    loader = Loader()
+    path = workbooks[0]
+    first = cache.get(path, "normalized", loader)
+
+    mtime = os.path.getmtime(path)
+    os.utime(path, (mtime + 10, mtime + 10))
+    assert cache.get(path, "normalized", loader) is first
+
+    # A watcher pushes the change instead
+    reloaded = cache.reload(path, "normalized", loader)
+    assert cache.get(path, "normalized", loader) is reloaded
@@ -0,0 +1,34 @@
+import pytest
+
+from durations import DURATION_UNITS, count_duration_units, parse_duration
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2-3 hours", ("hours", 2.0)),
+        ("30 s", ("seconds", 30.0)),
+        ("5 min", ("minutes", 5.0)),
+        ("10 minutes", ("minutes", 10.0)),
+        ("1.5 days", ("days", 1.5)),
+        ("About 2 Weeks", ("weeks", 2.0)),
+        ("several months", ("months", None)),
+        ("frequent", (None, None)),
+        ("15", (None, 15.0)),
+    ],
+)
+def test_parse_duration(text, expected):
+    assert parse_duration(text) == expected
+    # Memoized: the second call returns the same result
+    assert parse_duration(text) == expected
+
+
+def test_count_duration_units():
+    texts = ["5 min", "2 days", None, float("nan"), "frequent", "30 s", "3 days"]
+    counts = count_duration_units(texts)
+    assert counts == [1, 1, 0, 2, 0, 0, 0]
+    assert len(counts) == len(DURATION_UNITS)
+
+
+def test_count_duration_units_empty():
+    assert count_duration_units([]) == [0] * len(DURATION_UNITS)
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from cohort_manifest import list_workbooks
+from filter_bitmaps import FIXED_CRITERIA, bitmap_column
+from genotypes import GENOTYPE_FLAGS
+from normalization import expand_categoricals
+from utils import apply_filter, get_cached_dataframe
+
+DIRECTORIES = ["excel", "excel1", "excel2"]
+
+
+@pytest.fixture(autouse=True)
+def repository_root(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+def workbooks():
+    root = os.path.dirname(os.path.abspath(__file__))
+    return [
+        os.path.join(directory, filename)
+        for directory in DIRECTORIES
+        for filename in list_workbooks(os.path.join(root, directory))
+    ]
+
+
+def selected(df, *filters):
+    """Row labels apply_filter keeps, or the type of the error it raises."""
+    try:
+        return apply_filter(df, *filters).index.tolist()
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("file_path", workbooks())
+def test_apply_filter_with_and_without_bitmaps(file_path):
+    df = get_cached_dataframe(file_path)
+    precomputed = [bitmap_column(criteria) for criteria in FIXED_CRITERIA] + GENOTYPE_FLAGS
+    assert any(col in df.columns for col in precomputed)
+
+    plain = df.drop(columns=[col for col in precomputed if col in df.columns])
+    # The object frame the filters ran on before columns became categoricals
+    plain_objects = expand_categoricals(plain)
+
+    for filter_criteria in range(1, 10):
+        for country, mutation in [(None, None), ("DEU, ITA", None), (None, "pathogenic")]:
+            filters = (filter_criteria, 40, country, mutation)
+            expected = selected(plain_objects, *filters)
+            assert selected(df, *filters) == expected, filters
+            assert selected(plain, *filters) == expected, filters
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from genotypes import (
+    COMP_HET_FLAG,
+    HET_ONLY_FLAG,
+    HOM_OR_COMP_HET_FLAG,
+    classify_genotypes,
+    compound_het_mask,
+)
+
+# (case, [(gene, mut_p, genotype) per slot], compound heterozygous)
+CASES = [
+    ("het/het same gene", [("PINK1", "p.A1B", "het"), ("PINK1", "p.C2D", "het")], True),
+    ("het/het same mutation", [("PINK1", "p.A1B", "het"), ("PINK1", "p.A1B", "het")], False),
+    ("het/het different genes", [("PINK1", "p.A1B", "het"), ("PRKN", "p.C2D", "het")], False),
+    ("single het", [("PINK1", "p.A1B", "het")], False),
+    ("comp_het then same gene", [("PINK1", "p.A1B", "comp_het"), ("PINK1", "p.C2D", "het")], True),
+    ("het then comp_het", [("PINK1", "p.A1B", "het"), ("PINK1", "p.C2D", "comp_het")], False),
+    ("comp_het alone", [("PINK1", "p.A1B", "comp_het")], False),
+    ("comp_het other gene", [("PINK1", "p.A1B", "comp_het"), ("PRKN", "p.C2D", "het")], False),
+    ("-99 mutation", [("PINK1", "p.A1B", "het"), ("PINK1", "-99", "het")], False),
+    ("-99 gene", [("PINK1", "p.A1B", "het"), ("-99", "p.C2D", "het")], False),
+    ("missing genotype", [("PINK1", "p.A1B", "het"), ("PINK1", "p.C2D", None)], False),
+    # Numeric NaN is not a missing marker for the check, as for the row-wise original
+    ("NaN mutation", [("PINK1", "p.A1B", "het"), ("PINK1", np.nan, "het")], True),
+    ("het/het over slots 1 and 3", [("PINK1", "p.A1B", "het"), None, ("PINK1", "p.C2D", "het")], True),
+    ("hom", [("PINK1", "p.A1B", "hom")], False),
+]
+
+
+def _frame(slot_rows):
+    data = {}
+    for i in range(1, 4):
+        slots = [slots[i - 1] if i <= len(slots) and slots[i - 1] else (None, None, None) for slots in slot_rows]
+        data[f"gene{i}"] = [gene for gene, _, _ in slots]
+        data[f"mut{i}_p"] = [mut for _, mut, _ in slots]
+        data[f"mut{i}_genotype"] = [genotype for _, _, genotype in slots]
+    return pd.DataFrame(data, dtype=object)
+
+
+@pytest.mark.parametrize("case, slots, expected", CASES, ids=[case for case, _, _ in CASES])
+def test_compound_het_mask(case, slots, expected):
+    assert compound_het_mask(_frame([slots])).tolist() == [expected]
+
+
+def test_compound_het_mask_categorical_columns():
+    # A categorical has one missing code, read back as None, so the NaN case does not apply
+    cases = [(slots, result) for case, slots, result in CASES if case != "NaN mutation"]
+    df = _frame([slots for slots, _ in cases])
+    expected = [result for _, result in cases]
+    assert compound_het_mask(df.astype("category")).tolist() == expected
+
+
+def test_classify_genotypes():
+    df = _frame(
+        [
+            [("PINK1", "p.A1B", "het"), ("PINK1", "p.C2D", "het")],
+            [("PINK1", "p.A1B", "het")],
+            [("PINK1", "p.A1B", "hom")],
+            [("PINK1", "-99", "-99")],
+        ]
+    )
+    flags = classify_genotypes(df)
+    assert flags[COMP_HET_FLAG].tolist() == [True, False, False, False]
+    assert flags[HET_ONLY_FLAG].tolist() == [False, True, False, False]
+    assert flags[HOM_OR_COMP_HET_FLAG].tolist() == [True, False, True, False]
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from levodopa import LEVODOPA_CATEGORY, add_levodopa_category, classify_levodopa_response
+
+# (levodopa_response, response_quantification, category)
+CASES = [
+    # Every quantification keyword of a "yes" response
+    ("yes", "good/excellent", "Good"),
+    ("yes", "good/transient", "Good"),
+    ("yes", "good", "Good"),
+    ("yes", "excellent", "Good"),
+    ("yes", "significantly", "Good"),
+    ("yes", "minimal/intermittent", "Minimal"),
+    ("yes", "minimal", "Minimal"),
+    ("yes", "intermittent", "Minimal"),
+    ("yes", "poor", "Minimal"),
+    ("yes", "moderate", "Moderate"),
+    ("yes", "marked", "Moderate"),
+    ("yes", "not treated", "Not treated"),
+    # "-99" is listed under "Yes, undefined" but reads as no quantification first
+    ("yes", "-99", "Yes, unquantified"),
+    ("yes", np.nan, "Yes, unquantified"),
+    ("yes", "", "Yes, unquantified"),
+    ("Yes", "Good", "Good"),
+    ("yes", "somewhat", None),
+    ("no", "good", "No"),
+    ("No", np.nan, "No"),
+    ("not treated", np.nan, "Not treated"),
+    ("-99", "good", None),
+    (np.nan, "good", None),
+    ("unclear", "good", None),
+]
+
+
+def _frame(cases):
+    return pd.DataFrame(
+        {
+            "levodopa_response": [response for response, _, _ in cases],
+            "response_quantification": [quantification for _, quantification, _ in cases],
+        },
+        dtype=object,
+    )
+
+
+@pytest.mark.parametrize("response, quantification, expected", CASES)
+def test_classify_levodopa_response(response, quantification, expected):
+    assert classify_levodopa_response(_frame([(response, quantification, None)])).tolist() == [expected]
+
+
+def test_classify_levodopa_response_categorical_columns():
+    df = _frame(CASES).astype("category")
+    assert classify_levodopa_response(df).tolist() == [expected for _, _, expected in CASES]
+
+
+def test_add_levodopa_category():
+    df = add_levodopa_category(_frame(CASES))
+    assert isinstance(df[LEVODOPA_CATEGORY].dtype, pd.CategoricalDtype)
+    assert df[LEVODOPA_CATEGORY].astype(object).where(df[LEVODOPA_CATEGORY].notna(), None).tolist() == [
+        expected for _, _, expected in CASES
+    ]
+
+
+def test_add_levodopa_category_without_columns():
+    df = pd.DataFrame({"pmid": [1, 2]})
+    assert add_levodopa_category(df) is df
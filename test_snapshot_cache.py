@@ -0,0 +1,139 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot_cache
+import utils
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "snapshots"
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "excel" / "GENE-DIS.xlsx"
+    path.parent.mkdir()
+    path.write_bytes(b"first version")
+    return str(path)
+
+
+def normalized_frame():
+    return pd.DataFrame(
+        {
+            "pmid": ["1", "2", None],
+            "aao": [34.0, np.nan, -99.0],
+            "sex": pd.Categorical(["male", "female", None]),
+            "index_pat": [True, False, True],
+        }
+    )
+
+
+def test_round_trip(workbook):
+    df = normalized_frame()
+    key = snapshot_cache.snapshot_key(workbook)
+    assert snapshot_cache.load_snapshot(key, 1) is None
+
+    assert snapshot_cache.save_snapshot(df, key, 1)
+    loaded = snapshot_cache.load_snapshot(key, 1)
+    pd.testing.assert_frame_equal(loaded, df)
+    # NaN stays a float value, not a null
+    assert np.isnan(loaded["aao"].iloc[1])
+
+
+def test_changed_content_misses(workbook):
+    key = snapshot_cache.snapshot_key(workbook)
+    snapshot_cache.save_snapshot(normalized_frame(), key, 1)
+
+    with open(workbook, "wb") as f:
+        f.write(b"second version")
+    new_key = snapshot_cache.snapshot_key(workbook)
+    assert new_key != key
+    assert snapshot_cache.load_snapshot(new_key, 1) is None
+
+
+def test_other_normalization_version_misses(workbook):
+    key = snapshot_cache.snapshot_key(workbook)
+    snapshot_cache.save_snapshot(normalized_frame(), key, 1)
+    assert snapshot_cache.load_snapshot(key, 2) is None
+
+
+def test_same_content_under_other_name_misses(workbook, tmp_path):
+    other = tmp_path / "excel" / "OTHER-DIS.xlsx"
+    other.write_bytes(b"first version")
+    key = snapshot_cache.snapshot_key(workbook)
+    snapshot_cache.save_snapshot(normalized_frame(), key, 1)
+    assert snapshot_cache.load_snapshot(snapshot_cache.snapshot_key(str(other)), 1) is None
+
+
+def test_unreadable_snapshot_misses(workbook, snapshot_dir):
+    key = snapshot_cache.snapshot_key(workbook)
+    snapshot_dir.mkdir()
+    with open(snapshot_cache.get_snapshot_path(key, 1), "wb") as f:
+        f.write(b"not arrow")
+    assert snapshot_cache.load_snapshot(key, 1) is None
+
+
+def test_save_removes_outdated_snapshots(workbook, snapshot_dir):
+    old_key = snapshot_cache.snapshot_key(workbook)
+    with snapshot_cache.snapshot_lock(old_key):
+        snapshot_cache.save_snapshot(normalized_frame(), old_key, 1)
+
+    with open(workbook, "wb") as f:
+        f.write(b"second version")
+    key = snapshot_cache.snapshot_key(workbook)
+    with snapshot_cache.snapshot_lock(key):
+        snapshot_cache.save_snapshot(normalized_frame(), key, 2)
+
+    expected = {os.path.basename(snapshot_cache.get_snapshot_path(key, 2))}
+    if snapshot_cache.fcntl is not None:
+        expected.add(f"{key}.lock")
+    assert set(os.listdir(snapshot_dir)) == expected
+
+
+def test_prune_snapshots(workbook, tmp_path, snapshot_dir):
+    removed = tmp_path / "excel" / "REMOVED-DIS.xlsx"
+    removed.write_bytes(b"removed")
+    key = snapshot_cache.snapshot_key(workbook)
+    removed_key = snapshot_cache.snapshot_key(str(removed))
+    snapshot_cache.save_snapshot(normalized_frame(), key, 2)
+    snapshot_cache.save_snapshot(normalized_frame(), removed_key, 2)
+    stale_key = f"{snapshot_cache.workbook_key(workbook)}_{'0' * 64}"
+    for filename in [
+        f"{key}.lock",
+        f"{key}_v1.arrow",
+        f"{removed_key}.lock",
+        f"{stale_key}.lock",
+        f"{'0' * 64}_v2.arrow",
+        f"{'0' * 64}.lock",
+    ]:
+        (snapshot_dir / filename).write_bytes(b"")
+
+    snapshot_cache.prune_snapshots(2, [workbook])
+    assert set(os.listdir(snapshot_dir)) == {f"{key}_v2.arrow", f"{key}.lock"}
+
+
+def test_load_normalized_dataframe_rebuilds_stale_snapshot(tmp_path, snapshot_dir, monkeypatch):
+    workbook = tmp_path / "excel" / "VPS35-PD-original.xlsx"
+    workbook.parent.mkdir()
+    shutil.copy(os.path.join(os.path.dirname(__file__), "excel", "VPS35-PD-original.xlsx"), workbook)
+    parses = []
+    read_normalized = utils._read_normalized_dataframe
+    monkeypatch.setattr(
+        utils, "_read_normalized_dataframe", lambda path: parses.append(path) or read_normalized(path)
+    )
+
+    first = utils.load_normalized_dataframe(str(workbook))
+    second = utils.load_normalized_dataframe(str(workbook))
+    assert len(parses) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    monkeypatch.setattr(utils, "NORMALIZATION_VERSION", utils.NORMALIZATION_VERSION + 1)
+    utils.load_normalized_dataframe(str(workbook))
+    assert len(parses) == 2
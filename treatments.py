@@ -0,0 +1,103 @@
+import pandas as pd
+
+import dataset_cache
+
+OTHER_DRUG_COLUMN = "other_drug_response"
+RESPONSE_TYPES = ["positive", "negative", "none", "temporary", "partial", "unknown"]
+
+# Exact values of a standard *_response column -> response type; other values are not counted
+_STANDARD_RESPONSES = {"-99": "unknown"}
+for _response in RESPONSE_TYPES[:-1]:
+    _STANDARD_RESPONSES[_response] = _response
+    _STANDARD_RESPONSES[_response.capitalize()] = _response
+
+TABLE_COLUMNS = ["row", "column", "treatment", "response"]
+
+# dataset_cache variant holding a workbook's treatment table
+TREATMENT_VARIANT = "treatments"
+
+
+def standard_treatment_columns(df):
+    """The *_response columns of a frame besides other_drug_response, in sheet order."""
+    columns = []
+    for col in df.columns:
+        col_str = str(col).strip()  # Trim spaces like Java's trim()
+        if col_str.endswith("_response") and col_str != OTHER_DRUG_COLUMN:
+            columns.append(col_str)
+    return columns
+
+
+def _standard_responses(df, col):
+    values = df[col]
+    response = pd.Series(values.map(_STANDARD_RESPONSES), index=df.index, dtype=object)
+    response[values.isna().to_numpy()] = "unknown"
+    response = response.dropna()
+    return pd.DataFrame(
+        {"row": response.index, "column": col, "treatment": col, "response": response.to_numpy()}
+    )
+
+
+def _other_drug_responses(df):
+    values = df[OTHER_DRUG_COLUMN]
+    values = values[values.notna().to_numpy()].astype(str)
+    values = values[values != "-99"]
+
+    # "drug_response; drug_response" -> one entry per drug
+    entries = values.str.split(";").explode().str.strip()
+    entries = entries[entries != ""]
+
+    # Split on the first underscore; an entry without one is a drug with an unknown response
+    parts = entries.str.partition("_")
+    has_response = (parts[1] == "_").to_numpy()
+    response = parts[2].str.strip().str.lower()
+    response = response.where(response.isin(RESPONSE_TYPES[:-1]) & has_response, "unknown")
+
+    return pd.DataFrame(
+        {
+            "row": entries.index,
+            "column": OTHER_DRUG_COLUMN,
+            "treatment": parts[0].str.strip() + "_response",
+            "response": response.to_numpy(),
+        }
+    )
+
+
+def build_treatment_table(df):
+    """
+    Long (row, column, treatment, response) table of a normalized frame: one
+    entry per patient and standard *_response column, and one per drug listed
+    in other_drug_response ("drug_response; ..."). `row` is the frame's index
+    label and `response` one of RESPONSE_TYPES.
+    """
+    parts = [_standard_responses(df, col) for col in standard_treatment_columns(df) if col in df.columns]
+    if OTHER_DRUG_COLUMN in df.columns:
+        parts.append(_other_drug_responses(df))
+    if not parts:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+    return pd.concat(parts, ignore_index=True)[TABLE_COLUMNS]
+
+
+def get_treatment_table(file_path, df):
+    """
+    The treatment table of a workbook's cached frame `df`. It is kept in the
+    dataset cache as a variant of the workbook, so it shares the cache budget
+    and is dropped whenever the workbook changes.
+    """
+    return dataset_cache.get_dataset(file_path, TREATMENT_VARIANT, lambda _: build_treatment_table(df))
+
+
+def count_responses(table, carriers, columns):
+    """
+    {gene: {treatment: {response: count}}} of the table entries from `columns`
+    of the patients in carriers, a (row, gene) frame as get_gene_frames yields.
+    """
+    selected = table[table["row"].isin(carriers["row"]) & table["column"].isin(columns)]
+    if selected.empty:
+        return {}
+    entries = selected.merge(carriers, on="row")
+    counts = {}
+    for (gene, treatment, response), count in entries.groupby(
+        ["gene", "treatment", "response"], sort=False
+    ).size().items():
+        counts.setdefault(gene, {}).setdefault(treatment, {})[response] = int(count)
+    return counts
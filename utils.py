@@ -6,12 +6,18 @@ import json
 import logging
 from difflib import get_close_matches
 import math
+import time
 from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
+import dataset_cache
+import snapshot_cache
+from filter_bitmaps import FIXED_CRITERIA, criterion_mask
+from normalization import NORMALIZATION_VERSION, expand_categoricals, normalize_dataframe
+
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
-_dataframe_cache = {}
+NORMALIZED_VARIANT = "normalized"
 
 # List of expected headers extracted from the provided code
 EXPECTED_HEADERS = {
@@ -391,14 +397,6 @@ COUNTRIES = {
     "ZWE": "Zimbabwe",
 }
 
-RESPONSE_QUANTIFICATION = {
-    "Good": ["good/excellent", "good/transient", "good", "excellent", "significantly"],
-    "Yes, undefined": ["-99"],
-    "Minimal": ["minimal/intermittent", "minimal", "intermittent", "poor"],
-    "Moderate": ["moderate", "marked"],
-    "Not treated": ["not treated"],
-}
-
 
 def get_symptom_translations():
     """Create a flat dictionary of all symptom translations from symptom_categories.json"""
@@ -470,228 +468,123 @@ def translate_column_names(df):
     return df
 
 
-def get_cached_dataframe(file_path):
-    global _dataframe_cache
+def _read_normalized_dataframe(file_path):
+    # Извлекаем список генов из имени файла (до первого минуса)
+    base_filename = os.path.basename(file_path)
+    genes_part = base_filename.split('-')[0]  # берем часть до первого минуса
+    valid_genes = [g.upper() for g in genes_part.split('_')]  # разбиваем по подчеркиваниям
 
-    try:
-        file_mod_time = os.path.getmtime(file_path)
-        if (
-            file_path in _dataframe_cache
-            and _dataframe_cache[file_path]["mod_time"] == file_mod_time
-        ):
-            return _dataframe_cache[file_path]["dataframe"]
-
-        # Извлекаем список генов из имени файла (до первого минуса)
-        base_filename = os.path.basename(file_path)
-        genes_part = base_filename.split('-')[0]  # берем часть до первого минуса
-        valid_genes = [g.upper() for g in genes_part.split('_')]  # разбиваем по подчеркиваниям
-
-        _, file_extension = os.path.splitext(file_path)
-        engine = "openpyxl" if file_extension.lower() == ".xlsx" else "xlrd"
-
-        df = pd.read_excel(file_path, engine=engine)
-
-        # Convert all headers to lower case and strip whitespace
-        df.columns = df.columns.str.lower().str.strip()
-
-        # Если есть гены для фильтрации, применяем фильтрацию
-        if valid_genes:
-            # Проверяем каждый ген отдельно
-            for i in range(1, 4):
-                gene_col = f'gene{i}'
-                if gene_col in df.columns:
-                    # Преобразуем значения в строки перед применением str.upper()
-                    gene_mask = ~df[gene_col].astype(str).fillna('').str.upper().isin(valid_genes)
-
-                    # Определяем связанные колонки только для текущего гена
-                    related_columns = [
-                    f'gene{i}', f'physical_location{i}', f'reference_allele{i}',
-                    f'observed_allele{i}', f'mut{i}_g', f'mut{i}_c', f'mut{i}_p',
-                    f'mut{i}_alias_original', f'mut{i}_alias', f'mut{i}_genotype',
-                        f'mut{i}_type', f'pathogenicity{i}', f'CADD_{i}',
-                        f'gnomad{i} v2.1.1', f'gnomad{i} v4.0.0'
-                ]
-                    # Фильтруем только существующие колонки
-                    existing_columns = [col for col in related_columns if col in df.columns]
-
-                    # Заменяем значения с учетом типа данных
-                    for col in existing_columns:
-                        if df[col].dtype in ['int64', 'float64']:
-                            df.loc[gene_mask, col] = -99
-                        else:
-                            df.loc[gene_mask, col] = '-99'
-
-        # Сначала обработаем PMID отдельно
-        if 'pmid' in df.columns:
-            df['pmid'] = df['pmid'].astype(str).str.strip().str.replace(r"\s+", " ")
-            df['pmid'] = df['pmid'].replace("-99", None)
-
-        for col in df.columns:
-            if col != 'pmid':  # Пропускаем PMID
-                try:
-                    # Сначала преобразуем в строку и очистим от пробелов
-                    df[col] = df[col].astype(str).str.strip().str.replace(r"\s+", " ")
-
-                    # Попробуем преобразовать обратно в числовой тип
-                    df[col] = pd.to_numeric(df[col], errors="raise")
-
-                    # Если все значения целые, преобразуем в int
-                    if (
-                        df[col].dtype == "float64"
-                        and df[col].notna().all()
-                        and (df[col] % 1 == 0).all()
-                    ):
-                        df[col] = df[col].astype("int64")
-
-                    # Заменяем -99 на np.nan для числовых колонок
-                    if df[col].dtype in ["int64", "float64"]:
-                        df[col] = df[col].replace(-99, np.nan)
-                except (ValueError, TypeError):
-                    # Если не получилось преобразовать в число, оставляем как строку
-                    # и заменяем "-99" на None
-                    df[col] = df[col].replace("-99", None)
-
-        _dataframe_cache[file_path] = {"dataframe": df, "mod_time": file_mod_time}
+    read_started = time.perf_counter()
+    df = dataset_cache.get_raw_workbook(file_path).copy()
+    read_time = time.perf_counter() - read_started
+
+    df, timings = normalize_dataframe(df, valid_genes, EXPECTED_HEADERS)
+    stages = ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items())
+    logger.info(f"Loaded {file_path}: read={read_time:.3f}s, {stages}")
+
+    return df
+
+
+def load_normalized_dataframe(file_path):
+    """Build the normalized frame of a workbook without going through the in-memory cache."""
+    # A persisted snapshot lets a fresh process skip the openpyxl parse entirely
+    key = snapshot_cache.snapshot_key(file_path)
+    df = snapshot_cache.load_snapshot(key, NORMALIZATION_VERSION)
+    if df is not None:
         return df
 
+    with snapshot_cache.snapshot_lock(key):
+        # Another worker may have written the snapshot while we waited for the lock
+        df = snapshot_cache.load_snapshot(key, NORMALIZATION_VERSION)
+        if df is not None:
+            return df
+
+        df = _read_normalized_dataframe(file_path)
+        if snapshot_cache.save_snapshot(df, key, NORMALIZATION_VERSION):
+            # Serve the mapped snapshot, which other workers share, instead of a private copy
+            mapped = snapshot_cache.load_snapshot(key, NORMALIZATION_VERSION)
+            if mapped is not None:
+                df = mapped
+    return df
+
+
+def get_cached_dataframe(file_path):
+    try:
+        return dataset_cache.get_dataset(file_path, NORMALIZED_VARIANT, load_normalized_dataframe)
+
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
         raise e
 
 
-def apply_filter(df, filter_criteria, aao, country: str, mutation: str):
-    print(
-        f"Applying filter with criteria: {filter_criteria}, aao: {aao}, country: {country}, mutation: {mutation}"
-    )
+def reload_cached_dataframe(file_path):
+    """Re-read a changed workbook and swap its normalized frame into the cache."""
+    return dataset_cache.reload_dataset(file_path, NORMALIZED_VARIANT, load_normalized_dataframe)
 
-    # Helper function to identify compound heterozygous cases
-    def has_compound_het(row):
-        genes = []
-        mutations = []
-        genotypes = []
-
-        # First pass: collect all valid mutations for each gene
-        for i in range(1, 4):
-            gene = row[f"gene{i}"]
-            mut = row[f"mut{i}_p"]  # Using protein level mutation
-            genotype = row[f"mut{i}_genotype"]
-
-            # Only consider valid entries
-            if (
-                gene not in ["-99", None]
-                and mut not in ["-99", None]
-                and genotype not in ["-99", None]
-            ):
-                genes.append(gene)
-                mutations.append(mut)
-                genotypes.append(genotype)
-
-        # Second pass: check for compound het cases
-        for i in range(len(genes)):
-            current_gene = genes[i]
-            # Skip if we've already processed this gene
-            if current_gene == "-99":
-                continue
-
-            # If this mutation is explicitly marked as comp_het, check if there's another mutation in the same gene
-            if genotypes[i] == "comp_het":
-                # Look for another mutation in the same gene
-                for j in range(len(genes)):
-                    if i != j and genes[j] == current_gene:
-                        return True
-                # If we didn't find another mutation in the same gene, ignore this comp_het marking
-                continue
-
-            # For het mutations, look for other hets in the same gene
-            if genotypes[i] == "het":
-                current_mutation = mutations[i]
-                # Look for other mutations in the same gene
-                for j in range(i + 1, len(genes)):
-                    if (
-                        genes[j] == current_gene
-                        and genotypes[j] == "het"
-                        and mutations[j] != current_mutation
-                    ):
-                        return True
-
-            # Mark this gene as processed
-            genes[i] = "-99"
-
-        return False
-
-    if filter_criteria == 1:
-        df = df[df["index_pat"] == "yes"]
-    elif filter_criteria == 2 and aao is not None:
-        df = df[df["aao"] < aao]
-    elif filter_criteria == 3 and aao is not None:
-        df = df[df["aao"] >= aao]
-    elif filter_criteria == 4:
-        df = df[df["sex"] == "female"]
-    elif filter_criteria == 5:
-        df = df[df["sex"] == "male"]
-    elif filter_criteria == 6:
-        df = df[
-            (df["mut1_genotype"] == "hom")
-            | (df["mut2_genotype"] == "hom")
-            | (df["mut3_genotype"] == "hom")
-        ]
-    elif filter_criteria == 7:
-        # First, create mask for rows with heterozygous mutations
-        het_condition = (
-            (df["mut1_genotype"] == "het")
-            | (df["mut2_genotype"] == "het")
-            | (df["mut3_genotype"] == "het")
-        )
 
-        # Filter out compound hets
-        df = df[het_condition & ~df.apply(has_compound_het, axis=1)]
+# Columns searched by the `mutations` filter; missing pathogenicity compares as "", see mutation_search_keys
+PATHOGENICITY_SEARCH_COLUMNS = ["pathogenicity1", "pathogenicity2", "pathogenicity3"]
+MUTATION_SEARCH_COLUMNS = [
+    "mut1_p",
+    "mut2_p",
+    "mut3_p",
+    "mut1_c",
+    "mut2_c",
+    "mut3_c",
+    "mut1_g",
+    "mut2_g",
+    "mut3_g",
+]
 
-    elif filter_criteria == 8:
-        # Include both explicitly marked compound hets and implicit ones
-        # Check comments first
-        comments_pat_column = next(
-            (col for col in df.columns if col.lower() == "comments_pat"), None
-        )
 
-        if comments_pat_column:
-            comments_condition = (
-                df[comments_pat_column]
-                .astype(str)
-                .str.contains("compound heterozygous mutation", case=False, na=False)
-            )
-        else:
-            comments_condition = pd.Series(False, index=df.index)
-
-        # Combine explicit genotype condition and implicit compound het detection
-        df = df[comments_condition | df.apply(has_compound_het, axis=1)]
-    elif filter_criteria == 9:
-
-        def has_hom_or_comp_het(row):
-            # Check for homozygous mutations
-            for i in range(1, 4):
-                if row[f"mut{i}_genotype"] == "hom":
-                    return True
-            # Check for compound het
-            return has_compound_het(row)
-
-        comments_pat_column = next(
-            (col for col in df.columns if col.lower() == "comments_pat"), None
-        )
+def parse_mutation_filter(mutation):
+    return [m.strip().lower() for m in mutation.split(",")]
 
-        if comments_pat_column:
-            comments_condition = (
-                df[comments_pat_column]
-                .astype(str)
-                .str.contains(
-                    "compound heterozygous mutation|homozygous mutation",
-                    case=False,
-                    na=False,
-                )
-            )
-        else:
-            comments_condition = pd.Series(False, index=df.index)
 
-        df = df[comments_condition | df.apply(has_hom_or_comp_het, axis=1)]
+def _missing_search_key(na_value):
+    # A missing text value used to be None, whose string form is "None"
+    return "none" if na_value is None else na_value
+
+
+def mutation_search_keys(series, na_value=None):
+    """
+    The lower-cased string of every value of a column, as the `mutations` filter
+    compares it; missing values become `na_value` if one is given.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = series.cat.categories.astype(str).str.lower().to_numpy(dtype=object)
+        labels = np.append(labels, _missing_search_key(na_value))
+        return labels[series.cat.codes.to_numpy()]
+    if na_value is not None:
+        series = series.fillna(na_value)
+    return series.astype(str).str.lower().to_numpy(dtype=object)
+
+
+def mutation_search_mask(series, values, na_value=None):
+    """Rows whose search key is one of `values`; categoricals are matched per category."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        matches = series.cat.categories.astype(str).str.lower().isin(values)
+        matches = np.append(matches, _missing_search_key(na_value) in values)
+        return pd.Series(matches[series.cat.codes.to_numpy()], index=series.index)
+    if na_value is not None:
+        series = series.fillna(na_value)
+    return series.astype(str).str.lower().isin(values)
+
+
+def filter_mask(df, filter_criteria, aao, country: str, mutation: str):
+    """The row mask apply_filter selects with, or None if no filter restricts the rows."""
+    print(
+        f"Applying filter with criteria: {filter_criteria}, aao: {aao}, country: {country}, mutation: {mutation}"
+    )
+
+    # Every predicate adds a mask; the rows are materialized once by the caller
+    mask = None
+    if filter_criteria == 2 and aao is not None:
+        mask = df["aao"] < aao
+    elif filter_criteria == 3 and aao is not None:
+        mask = df["aao"] >= aao
+    elif filter_criteria in FIXED_CRITERIA:
+        mask = criterion_mask(df, filter_criteria)
 
     if country:
         valid_country_codes = set(COUNTRIES.keys())
@@ -699,46 +592,33 @@ def apply_filter(df, filter_criteria, aao, country: str, mutation: str):
         valid_countries = [c for c in country_list if c in valid_country_codes]
 
         if valid_countries:
-            df = df[df["country"].isin(valid_countries)]
+            country_mask = df["country"].isin(valid_countries)
+            mask = country_mask if mask is None else mask & country_mask
 
     if mutation:
-        mutation_list = [m.strip().lower() for m in mutation.split(",")]
+        mutation_list = parse_mutation_filter(mutation)
         pathogenicity_condition = (
-            df["pathogenicity1"].fillna("").astype(str).str.lower().isin(mutation_list)
-            | df["pathogenicity2"]
-            .fillna("")
-            .astype(str)
-            .str.lower()
-            .isin(mutation_list)
-            | df["pathogenicity3"]
-            .fillna("")
-            .astype(str)
-            .str.lower()
-            .isin(mutation_list)
+            mutation_search_mask(df["pathogenicity1"], mutation_list, na_value="")
+            | mutation_search_mask(df["pathogenicity2"], mutation_list, na_value="")
+            | mutation_search_mask(df["pathogenicity3"], mutation_list, na_value="")
         )
 
-        mutation_columns = [
-            "mut1_p",
-            "mut2_p",
-            "mut3_p",
-            "mut1_c",
-            "mut2_c",
-            "mut3_c",
-            "mut1_g",
-            "mut2_g",
-            "mut3_g",
-        ]
-
         mutation_condition = False
-        for col in mutation_columns:
+        for col in MUTATION_SEARCH_COLUMNS:
             if col in df.columns:
-                mutation_condition |= (
-                    df[col].astype(str).str.lower().isin(mutation_list)
-                )
+                mutation_condition |= mutation_search_mask(df[col], mutation_list)
 
-        df = df[pathogenicity_condition | mutation_condition]
+        mutation_mask = pathogenicity_condition | mutation_condition
+        mask = mutation_mask if mask is None else mask & mutation_mask
 
-    return df
+    return mask
+
+
+def apply_filter(df, filter_criteria, aao, country: str, mutation: str):
+    mask = filter_mask(df, filter_criteria, aao, country, mutation)
+    if mask is None:
+        return df
+    return df[mask]
 
 
 class NumpyEncoder(json.JSONEncoder):
@@ -752,6 +632,28 @@ class NumpyEncoder(json.JSONEncoder):
         return super(NumpyEncoder, self).default(obj)
 
 
+def count_values(series, dropna=True):
+    """
+    series.value_counts() for both object and categorical columns.
+
+    For categoricals the int8 codes are counted directly; unused categories are
+    left out and ties keep the order of first appearance, exactly as for object
+    columns.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.value_counts(dropna=dropna)
+
+    codes = series.cat.codes.to_numpy()
+    if dropna:
+        codes = codes[codes >= 0]
+    present, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+    order = np.argsort(first_seen, kind="stable")
+    # Code -1 (missing) picks the trailing NaN
+    labels = np.append(series.cat.categories.to_numpy(dtype=object), np.nan)
+    index = pd.Index(labels[present[order]], dtype=object, name=series.name)
+    return pd.Series(counts[order], index=index, name="count").sort_values(ascending=False)
+
+
 def safe_get(df, column, index, default=None):
     try:
         if isinstance(df, pd.DataFrame):
@@ -812,281 +714,3 @@ def extract_year(author_year):
     if match:
         return int(match.group())
     return 0  # Default to 0 if no year is found
-
-
-def fetch_trigger_data(
-    genes,
-    filter_criteria=None,
-    aao=None,
-    countries=None,
-    mutations=None,
-    directory="excel",
-):
-    """
-    Fetch trigger data for the specified genes,
-    counting each raw category *and* missing entries.
-    """
-    trigger_data = {}
-
-    # Define trigger columns for each gene (as per spec) citeturn1file0
-    trigger_columns = {
-        "CACNA1A": [
-            "trigger",
-        ],
-        "KCNA1": [
-            "trigger",
-        ],
-        "PDHA1": [
-            "trigger",
-        ],
-        "SLC1A3": [
-            "trigger",
-        ],
-    }
-
-    # Initialize
-    for gene in genes:
-        trigger_data[gene] = {}
-        for trig in trigger_columns.get(gene, []):
-            trigger_data[gene][trig] = {}
-
-    # Iterate Excel files
-    for fname in os.listdir(directory):
-        if fname.startswith((".~", "~$")):
-            continue
-        if not fname.lower().endswith(('.xlsx', '.xls')):
-            continue
-        if not any(g.upper() in fname.upper() for g in genes):
-            continue
-
-        fp = os.path.join(directory, fname)
-        try:
-            df = get_cached_dataframe(fp)
-            if 'mdsgene_decision' in df.columns:
-                df = df[df['mdsgene_decision'] == 'IN']
-            if filter_criteria or countries or mutations:
-                df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-            for gene in genes:
-                if gene.upper() not in fname.upper():
-                    continue
-                for trig in trigger_columns.get(gene, []):
-                    if trig not in df.columns:
-                        continue
-
-                    # 1) Count missing (“NaN” or “-99”)
-                    miss = df[trig].isna().sum() + (df[trig].astype(str) == "-99").sum()
-                    trigger_data[gene][trig]["Missing"] = (
-                        trigger_data[gene][trig].get("Missing", 0) + int(miss)
-                    )
-
-                    # 2) Count every other raw category
-                    vals = df[trig].dropna().astype(str)
-                    for v in vals:
-                        v = v.strip()
-                        if not v or v == "-99":
-                            continue
-                        trigger_data[gene][trig][v] = trigger_data[gene][trig].get(v, 0) + int(1)
-        except Exception as e:
-            logger.error(f"Error fetching triggers from {fname}: {e}")
-            continue
-
-    return trigger_data
-
-def fetch_duration_data(
-    genes,
-    filter_criteria=None,
-    aao=None,
-    countries=None,
-    mutations=None,
-    directory="excel",
-):
-    """
-    Fetch duration data for the specified genes as raw strings.
-
-    Parameters:
-    - genes: List of genes to include
-    - filter_criteria, aao, countries, mutations: Filtering parameters
-    - directory: Directory containing Excel files
-
-    Returns:
-    - Dictionary with duration data for each gene: {'GENE': {'shortest': [str,...], 'longest': [str,...], 'shortest_отсутствует': [str,...], 'longest_отсутствует': [str,...]}}
-    """
-    duration_data = {gene: {"shortest": [], "longest": [], "shortest_отсутствует": [], "longest_отсутствует": []} for gene in genes}
-
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue
-        if not (filename.endswith(".xlsx") or filename.endswith(".xls")):
-            continue
-        if not any(gene.upper() in filename.upper() for gene in genes):
-            continue
-
-        file_path = os.path.join(directory, filename)
-        try:
-            df = get_cached_dataframe(file_path)
-            if "mdsgene_decision" in df.columns:
-                df = df[df["mdsgene_decision"] == "IN"]
-            if filter_criteria or countries or mutations:
-                df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-            for gene in genes:
-                if gene.upper() not in filename.upper():
-                    continue
-                if "duration_of_shortest_attack" in df.columns:
-                    # Get all values that are not NaN
-                    valid_vals = df["duration_of_shortest_attack"].dropna().astype(str)
-                    duration_data[gene]["shortest"].extend(valid_vals.tolist())
-
-                    # Get all values that are NaN and add them to the missing elements list
-                    missing_vals = df[df["duration_of_shortest_attack"].isna()]["duration_of_shortest_attack"]
-                    duration_data[gene]["shortest_отсутствует"].extend(["отсутствует"] * len(missing_vals))
-                else:
-                    # If the column doesn't exist, all rows are considered missing
-                    duration_data[gene]["shortest_отсутствует"].extend(["отсутствует"] * len(df))
-
-                if "duration_of_longest_attack" in df.columns:
-                    # Get all values that are not NaN
-                    valid_vals = df["duration_of_longest_attack"].dropna().astype(str)
-                    duration_data[gene]["longest"].extend(valid_vals.tolist())
-
-                    # Get all values that are NaN and add them to the missing elements list
-                    missing_vals = df[df["duration_of_longest_attack"].isna()]["duration_of_longest_attack"]
-                    duration_data[gene]["longest_отсутствует"].extend(["отсутствует"] * len(missing_vals))
-                else:
-                    # If the column doesn't exist, all rows are considered missing
-                    duration_data[gene]["longest_отсутствует"].extend(["отсутствует"] * len(df))
-        except Exception as e:
-            logger.error(f"Error fetching duration from {filename}: {e}")
-            continue
-
-    return duration_data
-
-def fetch_treatment_response_data(
-    genes,
-    filter_criteria=None,
-    aao=None,
-    countries=None,
-    mutations=None,
-    directory="excel",
-):
-    """
-    Fetch treatment response data for the specified genes.
-
-    Parameters:
-    - genes: List of genes to include
-    - filter_criteria, aao, countries, mutations: Filtering parameters
-    - directory: Directory containing Excel files
-
-    Returns:
-    - Dictionary with treatment response data for each gene
-    """
-    # Dynamically identify columns ending with "_response" from the first dataframe
-    standard_treatment_columns = []
-
-    other_drug_column = "other_drug_response"
-    response_types = ["positive", "negative", "none", "temporary", "partial", "unknown"]
-
-    treatment_data = {gene: {} for gene in genes}
-
-    # We'll populate standard_treatment_columns when processing the first file
-
-    for filename in os.listdir(directory):
-        if filename.startswith(".~") or filename.startswith("~$"):
-            continue  # Skip temporary Excel files
-
-        if not (filename.endswith(".xlsx") or filename.endswith(".xls")):
-            continue
-
-        # Check if file contains any of the requested genes
-        if not any(gene in filename.upper() for gene in genes):
-            continue
-
-        file_path = os.path.join(directory, filename)
-        try:
-            df = get_cached_dataframe(file_path)
-            logging.info(f"Processing file: {filename}, Initial DataFrame shape: {df.shape}")
-
-            if "mdsgene_decision" in df.columns:
-                df = df[df["mdsgene_decision"] == "IN"]
-
-            if filter_criteria is not None or countries is not None or mutations is not None:
-                df = apply_filter(df, filter_criteria, aao, countries, mutations)
-
-            # If this is the first file, identify columns ending with "_response"
-            if not standard_treatment_columns:
-                for col in df.columns:
-                    col_str = str(col).strip()  # Trim spaces like Java's trim()
-                    if col_str.endswith("_response") and col_str != other_drug_column:
-                        standard_treatment_columns.append(col_str)
-
-                # Initialize treatment_data with the identified standard treatment columns
-                for gene in genes:
-                    for col in standard_treatment_columns:
-                        treatment_data[gene][col] = {resp: 0 for resp in response_types}
-
-            # Process each gene in the file
-            for gene in genes:
-                if gene not in filename.upper():
-                    continue
-
-                # Process standard treatment columns
-                for col in standard_treatment_columns:
-                    if col not in df.columns:
-                        continue
-
-                    # Count response types
-                    for resp in ["positive", "negative", "none", "temporary", "partial"]:
-                        count = ((df[col] == resp) | (df[col] == resp.capitalize())).sum()
-                        treatment_data[gene][col][resp] += int(count)
-
-                    # Count unknown responses
-                    unknown_count = ((df[col] == "-99") | df[col].isna()).sum()
-                    treatment_data[gene][col]["unknown"] += int(unknown_count)
-
-                # Process other_drug_response column separately
-                if other_drug_column in df.columns:
-                    # Get non-null values
-                    other_drug_values = df[other_drug_column].dropna()
-
-                    for value in other_drug_values:
-                        if value == "-99":
-                            continue
-
-                        # Split by semicolon if multiple drugs are listed
-                        drug_entries = value.split(";")
-
-                        for entry in drug_entries:
-                            entry = entry.strip()
-                            if not entry:
-                                continue
-
-                            # Split by underscore to separate drug name and response
-                            parts = entry.split("_", 1)  # Split on first underscore only
-
-                            if len(parts) == 2:
-                                drug_name = parts[0].strip()
-                                response = parts[1].strip()  # Trim spaces like Java's trim()
-
-                                # Create drug key if it doesn't exist
-                                drug_key = f"{drug_name}_response"
-                                if drug_key not in treatment_data[gene]:
-                                    treatment_data[gene][drug_key] = {resp: 0 for resp in response_types}
-
-                                # Map response to standard types
-                                if response.lower() in ["positive", "negative", "none", "temporary", "partial"]:
-                                    treatment_data[gene][drug_key][response.lower()] += 1
-                                else:
-                                    treatment_data[gene][drug_key]["unknown"] += 1
-                            else:
-                                # If no underscore or invalid format, count as unknown
-                                drug_key = f"{entry}_response"
-                                if drug_key not in treatment_data[gene]:
-                                    treatment_data[gene][drug_key] = {resp: 0 for resp in response_types}
-                                treatment_data[gene][drug_key]["unknown"] += 1
-
-        except Exception as e:
-            logging.error(f"Error processing file {filename}: {str(e)}")
-            continue
-
-    return treatment_data
@@ -0,0 +1,133 @@
+import glob
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chart_views
+import cohort_manifest
+import dataset_cache
+import snapshot_cache
+import utils
+
+logger = logging.getLogger(__name__)
+
+# Worker processes used to parse workbooks at startup; defaults to the number of CPUs
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", 0)) or None
+
+_state = {
+    "ready": False,
+    "workbooks": 0,
+    "loaded": 0,
+    "failed": 0,
+    "seconds": None,
+}
+
+
+def find_directories():
+    return sorted(path for path in glob.glob("excel*") if os.path.isdir(path))
+
+
+def find_workbooks(directories=None):
+    if directories is None:
+        directories = find_directories()
+    return [
+        os.path.join(directory, filename)
+        for directory in directories
+        for filename in cohort_manifest.list_workbooks(directory)
+    ]
+
+
+def _build_snapshot(file_path):
+    # Runs in a pool process: only the snapshot is kept, the frame is not pickled back
+    utils.load_normalized_dataframe(file_path)
+
+
+def warm_up(directories=None, max_workers=WARMUP_WORKERS):
+    """
+    Parse and normalize every workbook in parallel worker processes.
+
+    The workers write the shared snapshots; this process then memory-maps them,
+    stores the frames in the dataset cache, indexes them in the cohort manifest
+    and returns them as {file_path: DataFrame}.
+    """
+    started = time.perf_counter()
+    file_paths = find_workbooks(directories)
+    if directories is None:
+        # Snapshots of removed workbooks and earlier normalization versions are never read again
+        snapshot_cache.prune_snapshots(utils.NORMALIZATION_VERSION, file_paths)
+    _state.update(workbooks=len(file_paths), loaded=0, failed=0)
+    mod_times = {file_path: os.path.getmtime(file_path) for file_path in file_paths}
+    frames = {}
+
+    if not file_paths:
+        return frames
+
+    # spawn, not fork: the parent already runs the event loop and watcher threads
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+        futures = {
+            pool.submit(_build_snapshot, file_path): file_path
+            for file_path in file_paths
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                future.result()
+                df = utils.load_normalized_dataframe(file_path)
+            except Exception as e:
+                _state["failed"] += 1
+                logger.error(f"Warm-up failed for {file_path}: {str(e)}")
+                continue
+
+            # A workbook replaced while it was parsed is left to the watcher
+            if os.path.getmtime(file_path) == mod_times[file_path]:
+                dataset_cache.put_dataset(file_path, utils.NORMALIZED_VARIANT, df, mod_times[file_path])
+                cohort_manifest.refresh_file_index(file_path)
+            frames[file_path] = df
+            _state["loaded"] += 1
+
+    logger.info(
+        f"Warm-up loaded {_state['loaded']}/{len(file_paths)} workbooks "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return frames
+
+
+def _run(directories, max_workers):
+    started = time.perf_counter()
+    try:
+        warm_up(directories, max_workers)
+    except Exception as e:
+        logger.error(f"Warm-up aborted: {str(e)}")
+    finally:
+        # Requests still load lazily if warm-up failed; do not keep the worker out forever
+        _state["seconds"] = round(time.perf_counter() - started, 3)
+        _state["ready"] = True
+
+    # Unfiltered chart payloads; until they are in, the charts are computed per request
+    for directory in directories if directories is not None else find_directories():
+        try:
+            chart_views.build_views(directory)
+        except Exception as e:
+            logger.error(f"Building chart views of {directory} failed: {str(e)}")
+
+
+def start_warmup(directories=None, max_workers=WARMUP_WORKERS):
+    """Run warm_up in a background thread so the server can answer /health meanwhile."""
+    _state["ready"] = False
+    thread = threading.Thread(
+        target=_run, args=(directories, max_workers), name="dataset-warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def is_ready():
+    return _state["ready"]
+
+
+def get_warmup_status():
+    return dict(_state)